@@ -1,12 +1,29 @@
-import requests
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
-from sklearn.preprocessing import StandardScaler
-from sklearn.decomposition import PCA
-from sklearn.cluster import KMeans
+
+from src.features.adjacency import SCHEMA_VERSION as SCHEMA_ADJACENCE, Adjacency
+from src.features.correlation import SCHEMA_VERSION as SCHEMA_CORRELATIONS, correlation_engine
+from src.features.rates import SCHEMA_VERSION as SCHEMA_TAUX, TOLERANCE, with_rates
+from src.features.segmentation import fit_segmentation, segmentation_features
+from src.io.cache import cached_artifact, dataset_version
+from src.io.geo import GEOJSON_DEPTS, load_geojson
+from src.io.loader import DATA_FILE, NOMS_DEPTS, NOMS_REGIONS, load_dataset
+from src.io.tensor import cached_tensor
+from src.models.anomalies import detect_anomalies
+from src.models.backtest import SCHEMA_VERSION as SCHEMA_BACKTEST, MODELS, backtest_all
+from src.models.hotspots import SCHEMA_VERSION as SCHEMA_POINTS_CHAUDS
+from src.models.hotspots import (
+    CLASSES_GI, NON_SIGNIFICATIF, QUADRANTS, gi_classes, hotspot_statistics, lisa_classes
+)
+from src.models.similarity import SCHEMA_VERSION as SCHEMA_SIMILARITE, METRICS, SimilarityIndex
+from src.models.uncertainty import SCHEMA_VERSION as SCHEMA_INCERTITUDE
+from src.models.uncertainty import (
+    CONFIDENCE, N_BOOTSTRAP, N_BOOTSTRAP_CLUSTERS, cluster_stability, uncertainty_all
+)
+from src.viz.figures import anomaly_map, annual_rate_map, top10_rate_bar
 
 
 # Configuration de la page
@@ -16,60 +33,43 @@ st.title("📊 Délinquance en France : évolution 2016–2024")
 st.caption("Analyse statistique des infractions enregistrées par département et région")
 
 # Lecture des données
-df = pd.read_csv("donnee-dep-data.gouv-2024-geographie2024-produit-le2025-03-14.csv", sep=';', encoding='utf-8')
+MILLESIME_POPULATION = None  # None : population publiée avec chaque année ; sinon une année (ex. 2024)
+
 
-# Nettoyage des colonnes
-df.columns = df.columns.str.strip().str.lower().str.replace(" ", "_")
-df["indicateur"] = df["indicateur"].str.strip()
-df["code_departement"] = df["code_departement"].astype(str).str.zfill(2)
+@st.cache_data
+def charger_donnees(version, millesime):
+    # Instantané nettoyé, complété des taux recalculés, persistant par version des données
+    return cached_artifact(
+        "donnees", version, lambda: with_rates(load_dataset(DATA_FILE), vintage=millesime, tolerance=TOLERANCE),
+        schema=SCHEMA_TAUX, params={"millesime": millesime, "tolerance": TOLERANCE}
+    )
 
-# Supprimer les DROM : ne garder que la France métropolitaine + Corse
-df = df[df["code_departement"].isin([f"{i:02d}" for i in range(1, 96)] + ["2A", "2B"])]
 
-# Nettoyage des taux : gérer les virgules et pourcentages
-df["taux_pour_mille"] = df["taux_pour_mille"].astype(str).str.strip()
-df["taux_pour_mille"] = df["taux_pour_mille"].apply(
-    lambda x: float(x.replace(",", ".").replace("%", "")) / 100 if "%" in x else float(x.replace(",", "."))
-)
+@st.cache_resource
+def charger_tenseur(version):
+    # Tableaux denses département × année × indicateur, relus en mémoire partagée (.npy)
+    return cached_tensor(version, lambda: df)
+
+
+version_donnees = dataset_version(DATA_FILE)
+df = charger_donnees(version_donnees, MILLESIME_POPULATION)
+tenseur = charger_tenseur(version_donnees)
 
-# Ajout manuel des noms des départements
-noms_depts = {
-    "01": "Ain", "02": "Aisne", "03": "Allier", "04": "Alpes-de-Haute-Provence", "05": "Hautes-Alpes",
-    "06": "Alpes-Maritimes", "07": "Ardèche", "08": "Ardennes", "09": "Ariège", "10": "Aube",
-    "11": "Aude", "12": "Aveyron", "13": "Bouches-du-Rhône", "14": "Calvados", "15": "Cantal",
-    "16": "Charente", "17": "Charente-Maritime", "18": "Cher", "19": "Corrèze", "2A": "Corse-du-Sud",
-    "2B": "Haute-Corse", "21": "Côte-d'Or", "22": "Côtes-d'Armor", "23": "Creuse", "24": "Dordogne",
-    "25": "Doubs", "26": "Drôme", "27": "Eure", "28": "Eure-et-Loir", "29": "Finistère",
-    "30": "Gard", "31": "Haute-Garonne", "32": "Gers", "33": "Gironde", "34": "Hérault",
-    "35": "Ille-et-Vilaine", "36": "Indre", "37": "Indre-et-Loire", "38": "Isère", "39": "Jura",
-    "40": "Landes", "41": "Loir-et-Cher", "42": "Loire", "43": "Haute-Loire", "44": "Loire-Atlantique",
-    "45": "Loiret", "46": "Lot", "47": "Lot-et-Garonne", "48": "Lozère", "49": "Maine-et-Loire",
-    "50": "Manche", "51": "Marne", "52": "Haute-Marne", "53": "Mayenne", "54": "Meurthe-et-Moselle",
-    "55": "Meuse", "56": "Morbihan", "57": "Moselle", "58": "Nièvre", "59": "Nord",
-    "60": "Oise", "61": "Orne", "62": "Pas-de-Calais", "63": "Puy-de-Dôme", "64": "Pyrénées-Atlantiques",
-    "65": "Hautes-Pyrénées", "66": "Pyrénées-Orientales", "67": "Bas-Rhin", "68": "Haut-Rhin", "69": "Rhône",
-    "70": "Haute-Saône", "71": "Saône-et-Loire", "72": "Sarthe", "73": "Savoie", "74": "Haute-Savoie",
-    "75": "Paris", "76": "Seine-Maritime", "77": "Seine-et-Marne", "78": "Yvelines", "79": "Deux-Sèvres",
-    "80": "Somme", "81": "Tarn", "82": "Tarn-et-Garonne", "83": "Var", "84": "Vaucluse",
-    "85": "Vendée", "86": "Vienne", "87": "Haute-Vienne", "88": "Vosges", "89": "Yonne",
-    "90": "Territoire de Belfort", "91": "Essonne", "92": "Hauts-de-Seine", "93": "Seine-Saint-Denis",
-    "94": "Val-de-Marne", "95": "Val-d'Oise"
-}
-df["nom_departement"] = df["code_departement"].map(noms_depts)
-
-# Ajout manuel des noms des régions
-noms_regions = {
-    "84": "Auvergne-Rhône-Alpes", "27": "Bourgogne-Franche-Comté", "53": "Bretagne",
-    "24": "Centre-Val de Loire", "94": "Corse", "44": "Grand Est", "32": "Hauts-de-France",
-    "11": "Île-de-France", "28": "Normandie", "75": "Nouvelle-Aquitaine",
-    "76": "Occitanie", "52": "Pays de la Loire", "93": "Provence-Alpes-Côte d'Azur"
-}
-df["code_region"] = df["code_region"].astype(str)
-df["nom_region"] = df["code_region"].map(noms_regions)
-
-# Chargement du GeoJSON des départements
-url_geojson = "https://france-geojson.gregoiredavid.fr/repo/departements.geojson"
-geojson_dept = requests.get(url_geojson).json()
+# Moteur d'incertitude : tirages bootstrap, graine et pool de calcul ("processus" ou "threads")
+BOOTSTRAP_TIRAGES = N_BOOTSTRAP
+BOOTSTRAP_TIRAGES_GROUPES = N_BOOTSTRAP_CLUSTERS
+BOOTSTRAP_CONFIANCE = CONFIDENCE
+BOOTSTRAP_GRAINE = 42
+POOL_TRAVAILLEURS = None  # None : un travailleur par cœur
+POOL_BACKEND = "processus"
+
+# Paramètres des moteurs persistés (ils font partie de la clé de cache)
+COUVERTURE_MIN = 0.8  # part minimale d'indicateurs renseignés pour la segmentation et la similarité
+PERMUTATIONS = 999
+PERMUTATIONS_GRAINE = 42
+
+# Chargement du GeoJSON des départements (copie locale après le premier téléchargement)
+geojson_dept = load_geojson()
 
 # Navigation par onglets
 tabs = st.tabs([
@@ -80,7 +80,8 @@ tabs = st.tabs([
     "Dynamique régionale",
 	"Segmentation territoriale",
 	"Détection des profils atypiques",
-    "Prévisions 2025"
+    "Prévisions 2025",
+    "Corrélations entre indicateurs"
 ])
 
 
@@ -108,6 +109,73 @@ def footer():
         "</div>",
         unsafe_allow_html=True
     )
+
+
+@st.cache_resource
+def charger_index_similarite(version):
+    # Reconstruit uniquement lorsque la version du jeu de données change
+    return cached_artifact(
+        "index_similarite", version,
+        lambda: SimilarityIndex.from_tensor(tenseur, min_coverage=COUVERTURE_MIN),
+        schema=SCHEMA_SIMILARITE, params={"min_coverage": COUVERTURE_MIN}
+    )
+
+
+@st.cache_data
+def charger_backtest(version):
+    # Backtest glissant de toutes les séries, calculé une fois par version des données
+    return cached_artifact("backtest", version, lambda: backtest_all(tenseur), schema=SCHEMA_BACKTEST)
+
+
+@st.cache_resource
+def charger_adjacence():
+    # Contiguïté construite une fois à partir des contours locaux
+    return cached_artifact(
+        "adjacence", dataset_version(GEOJSON_DEPTS), lambda: Adjacency.from_geojson(geojson_dept),
+        schema=SCHEMA_ADJACENCE
+    )
+
+
+@st.cache_data
+def charger_points_chauds(version):
+    # La contiguïté fait partie de la clé : un nouveau GeoJSON invalide aussi les statistiques
+    return cached_artifact(
+        "points_chauds", version,
+        lambda: hotspot_statistics(
+            tenseur, charger_adjacence(), permutations=PERMUTATIONS, seed=PERMUTATIONS_GRAINE,
+            n_jobs=POOL_TRAVAILLEURS, backend=POOL_BACKEND
+        ),
+        schema=SCHEMA_POINTS_CHAUDS,
+        params={
+            "geojson": dataset_version(GEOJSON_DEPTS), "adjacence": SCHEMA_ADJACENCE,
+            "permutations": PERMUTATIONS, "seed": PERMUTATIONS_GRAINE,
+        }
+    )
+
+
+@st.cache_data
+def charger_correlations(version):
+    return cached_artifact("correlations", version, lambda: correlation_engine(tenseur), schema=SCHEMA_CORRELATIONS)
+
+
+@st.cache_data
+def charger_incertitude(version):
+    # Intervalles bootstrap calculés une fois ; les vues se contentent de les lire
+    return cached_artifact(
+        "incertitude",
+        version,
+        lambda: uncertainty_all(
+            tenseur, segmentation_features(tenseur, min_coverage=COUVERTURE_MIN), n_boot=BOOTSTRAP_TIRAGES,
+            n_boot_clusters=BOOTSTRAP_TIRAGES_GROUPES, confidence=BOOTSTRAP_CONFIANCE, seed=BOOTSTRAP_GRAINE,
+            n_jobs=POOL_TRAVAILLEURS, backend=POOL_BACKEND
+        ),
+        schema=SCHEMA_INCERTITUDE,
+        params={
+            "n_boot": BOOTSTRAP_TIRAGES, "n_boot_clusters": BOOTSTRAP_TIRAGES_GROUPES,
+            "confidence": BOOTSTRAP_CONFIANCE, "seed": BOOTSTRAP_GRAINE, "min_coverage": COUVERTURE_MIN,
+        }
+    )
+
 	
 # --- 0. PAGE D’INTRODUCTION ---
 with tabs[0]:
@@ -255,43 +323,47 @@ with tabs[2]:
         col2.metric("Maximum départemental", f"{df_filtered['taux_pour_mille'].max():.2f}")
         col3.metric("Nombre de départements", df_filtered['code_departement'].nunique())
 
+        ic_moy = charger_incertitude(version_donnees)["moyennes"]
+        ic_moy = ic_moy[(ic_moy["annee"] == annee_select) & (ic_moy["indicateur"] == indicateur_select)]
+        if not ic_moy.empty:
+            col1.caption(
+                f"Intervalle de confiance à {BOOTSTRAP_CONFIANCE * 100:.0f} % : [{ic_moy['borne_basse'].iloc[0]:.2f} ; "
+                f"{ic_moy['borne_haute'].iloc[0]:.2f}] ({BOOTSTRAP_TIRAGES} rééchantillonnages)"
+            )
+
+        # Contrôle des taux publiés contre les taux recalculés à partir du nombre de faits
+        with st.expander("Contrôle des taux publiés"):
+            n_divergents = int(df_filtered["taux_divergent"].sum())
+            st.markdown(
+                f"Les taux sont recalculés à partir du **nombre de faits**, rapporté à la population "
+                f"(ou au nombre de logements pour les indicateurs publiés ainsi). "
+                f"**{n_divergents} département(s)** présentent un écart de plus de {TOLERANCE:.0%} "
+                f"avec le taux publié ; la colonne « Pour 1000 logements » permet une lecture alternative."
+            )
+            controle = df_filtered[[
+                "nom_departement", "taux_pour_mille", "taux_pop_recalcule", "taux_log_recalcule",
+                "denominateur_publie", "ecart_taux_publie", "taux_divergent"
+            ]].sort_values("ecart_taux_publie", ascending=False).rename(columns={
+                "nom_departement": "Département",
+                "taux_pour_mille": "Taux publié",
+                "taux_pop_recalcule": "Pour 1000 habitants (recalculé)",
+                "taux_log_recalcule": "Pour 1000 logements (recalculé)",
+                "denominateur_publie": "Dénominateur publié",
+                "ecart_taux_publie": "Écart relatif",
+                "taux_divergent": "Divergent"
+            })
+            st.dataframe(controle.round(3), hide_index=True)
+
         st.markdown("---")
 
         col_map, col_bar = st.columns(2)
 
         # Carte
-        fig_map = px.choropleth(
-            df_filtered,
-            geojson=geojson_dept,
-            locations="code_departement",
-            color="taux_pour_mille",
-            featureidkey="properties.code",
-            hover_name="nom_departement",
-            color_continuous_scale="OrRd",
-            range_color=(df_filtered["taux_pour_mille"].min(), df_filtered["taux_pour_mille"].max()),
-            title=f"Carte – Nombre d’infractions pour 1000 habitants ({annee_select})"
-        )
-        fig_map.update_geos(fitbounds="locations", visible=False)
-        fig_map.update_layout(
-            coloraxis_colorbar_title="Nombre pour 1000 habitants"
-        )
+        fig_map = annual_rate_map(df_filtered, geojson_dept, annee_select)
         col_map.plotly_chart(fig_map, use_container_width=True)
 
         # Bar chart Top 10
-        top10 = df_filtered.sort_values("taux_pour_mille", ascending=False).head(10)
-        fig_bar = px.bar(
-            top10,
-            x="nom_departement",
-            y="taux_pour_mille",
-            color="taux_pour_mille",
-            color_continuous_scale="OrRd",
-            title="Top 10 départements – Nombre pour 1000 habitants",
-            labels={
-                "taux_pour_mille": "Nombre pour 1000 habitants",
-                "nom_departement": "Département"
-            }
-        )
-        fig_bar.update_layout(xaxis_title="Département", yaxis_title="Nombre pour 1000 habitants")
+        fig_bar = top10_rate_bar(df_filtered)
         col_bar.plotly_chart(fig_bar, use_container_width=True)
 
         st.markdown("---")
@@ -318,6 +390,68 @@ with tabs[2]:
         )
         col_hist.plotly_chart(fig_hist, use_container_width=True)
 
+        st.markdown("---")
+
+        # Points chauds spatiaux
+        st.subheader("Points chauds et effets de voisinage")
+        st.markdown(
+            "Chaque département est comparé à ses **départements limitrophes**. "
+            "L’indice de **Moran local** repère les regroupements de valeurs élevées (ou faibles) "
+            "et les départements qui tranchent avec leur voisinage ; la statistique **Getis-Ord Gi\\*** "
+            "signale les zones où les valeurs élevées (points chauds) ou faibles (points froids) se concentrent. "
+            f"Significativité estimée par {PERMUTATIONS} permutations (Moran) ou approximation normale (Gi\\*)."
+        )
+
+        points_chauds = charger_points_chauds(version_donnees)
+        glob_sel = points_chauds["global"]
+        glob_sel = glob_sel[(glob_sel["annee"] == annee_select) & (glob_sel["indicateur"] == indicateur_select)]
+        local_sel = points_chauds["local"]
+        local_sel = local_sel[
+            (local_sel["annee"] == annee_select) & (local_sel["indicateur"] == indicateur_select)
+        ].copy()
+
+        col_glob, col_couche = st.columns([1, 2])
+        if not glob_sel.empty:
+            col_glob.metric(
+                "Moran global (autocorrélation spatiale)",
+                f"{glob_sel['moran_i'].iloc[0]:.2f}",
+                delta=f"p = {glob_sel['p_valeur'].iloc[0]:.3f}",
+                delta_color="off"
+            )
+        couche = col_couche.radio("Couche", ["Moran local (LISA)", "Getis-Ord Gi*"], horizontal=True)
+
+        if couche == "Getis-Ord Gi*":
+            local_sel["classe"] = gi_classes(local_sel)
+            ordre = CLASSES_GI
+            couleurs = dict(zip(CLASSES_GI, [
+                "#b2182b", "#ef8a62", "#fddbc7", "lightgray", "#d1e5f0", "#67a9cf", "#2166ac"
+            ]))
+        else:
+            local_sel["classe"] = lisa_classes(local_sel)
+            ordre = list(QUADRANTS.values()) + [NON_SIGNIFICATIF]
+            couleurs = {
+                "Haut-Haut": "crimson", "Haut-Bas": "#f4a582", "Bas-Bas": "#2166ac",
+                "Bas-Haut": "#92c5de", NON_SIGNIFICATIF: "lightgray"
+            }
+
+        local_sel["nom_departement"] = local_sel["code_departement"].map(NOMS_DEPTS)
+        fig_hot = px.choropleth(
+            local_sel,
+            geojson=geojson_dept,
+            locations="code_departement",
+            color="classe",
+            featureidkey="properties.code",
+            hover_name="nom_departement",
+            hover_data={"code_departement": False, "moran_local": ":.2f", "gi_star": ":.2f"},
+            category_orders={"classe": ordre},
+            color_discrete_map=couleurs,
+            labels={"classe": "Classe", "moran_local": "Moran local", "gi_star": "Gi*"},
+            title=f"{couche} – {indicateur_select} ({annee_select})"
+        )
+        fig_hot.update_geos(fitbounds="locations", visible=False)
+        fig_hot.update_layout(height=650, margin={"r": 0, "t": 40, "l": 0, "b": 0})
+        st.plotly_chart(fig_hot, use_container_width=True)
+
     footer()
 
 
@@ -369,9 +503,14 @@ with tabs[3]:
         fig_line.update_layout(xaxis_title="Année", yaxis_title="Nombre pour 1000 habitants")
         col1.plotly_chart(fig_line, use_container_width=True)
 
-        # 2. Heatmap année × indicateur
-        pivot = df_line.pivot_table(
-            index="indicateur", columns="annee", values="taux_pour_mille", aggfunc="mean"
+        # 2. Heatmap année × indicateur (lue directement dans le tenseur)
+        code_dep = df_line["code_departement"].iloc[0]
+        indicateurs_dep = sorted(df_line["indicateur"].unique())
+        valeurs_dep = tenseur.department(code_dep)[:, [tenseur.indicator_index(i) for i in indicateurs_dep]]
+        pivot = pd.DataFrame(
+            valeurs_dep.T,
+            index=pd.Index(indicateurs_dep, name="indicateur"),
+            columns=pd.Index(tenseur.years, name="annee")
         )
         fig_heatmap = px.imshow(
             pivot,
@@ -499,8 +638,16 @@ with tabs[4]:
         fig_box_region.update_layout(xaxis_tickangle=-45)
         col3.plotly_chart(fig_box_region, use_container_width=True)
 
-        # 4. Heatmap région vs année
-        heat_df = df_grouped.pivot(index='nom_region', columns='annee', values='taux_pour_mille')
+        # 4. Heatmap région vs année (moyennes régionales calculées sur le tenseur)
+        valeurs_reg = tenseur.taux_pour_mille[:, :, [tenseur.indicator_index(i) for i in indicateurs_region]]
+        regions_dep = np.array(tenseur.regions)
+        heat_df = pd.DataFrame(
+            {
+                NOMS_REGIONS[r]: np.nanmean(valeurs_reg[regions_dep == r], axis=(0, 2))
+                for r in set(regions_dep) if r in NOMS_REGIONS
+            },
+            index=pd.Index(tenseur.years, name="annee")
+        ).T.sort_index().rename_axis("nom_region")
         fig_heatmap = px.imshow(
             heat_df,
             labels=dict(x="Année", y="Région", color="Nombre pour 1000 habitants"),
@@ -536,22 +683,18 @@ with tabs[5]:
     """)
 
     # --- Préparation des données
-    pivot_taux = df.pivot_table(index="code_departement", columns="indicateur", values="taux_pour_mille", aggfunc="mean")
-    pivot_taux.columns = [f"{col}_pour_1000_hab" for col in pivot_taux.columns]
-    df_clust = pivot_taux.dropna(thresh=int(pivot_taux.shape[1] * 0.8))
-
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(df_clust)
-
-    pca = PCA(n_components=2)
-    X_pca = pca.fit_transform(X_scaled)
-
-    kmeans = KMeans(n_clusters=4, random_state=42)
-    labels = kmeans.fit_predict(X_pca)
+    df_clust = segmentation_features(tenseur, min_coverage=COUVERTURE_MIN)
+    colonnes_clust = list(df_clust.columns)
+    labels, X_pca, pca = fit_segmentation(df_clust)
 
     df_clust["Groupe"] = labels.astype(str)
     df_clust["Axe 1"] = X_pca[:, 0]
     df_clust["Axe 2"] = X_pca[:, 1]
+
+    # Stabilité des groupes : fréquence de co-affectation sur des rééchantillons bootstrap
+    coclustering = charger_incertitude(version_donnees)["coclustering"]
+    coclustering = coclustering.loc[df_clust.index, df_clust.index]
+    df_clust["Stabilité"] = cluster_stability(coclustering, labels).round(2)
     df_clust = df_clust.reset_index().merge(df[["code_departement", "nom_departement"]].drop_duplicates(), on="code_departement")
 
     # --- Carte des groupes
@@ -564,6 +707,7 @@ with tabs[5]:
         color="Groupe",
         featureidkey="properties.code",
         hover_name="nom_departement",
+        hover_data={"code_departement": False, "Stabilité": True},
         title="Carte des départements par groupe"
     )
     fig_map.update_geos(
@@ -593,6 +737,28 @@ with tabs[5]:
     fig_pca.update_layout(legend_title="Groupe")
     st.plotly_chart(fig_pca, use_container_width=True)
 
+    # --- Stabilité de la segmentation
+    st.subheader("Stabilité des groupes")
+    st.markdown(
+        "La segmentation est recalculée sur des échantillons bootstrap de départements. La matrice indique, pour chaque "
+        "paire de départements, la part des rééchantillons où ils sont classés dans le même groupe ; la **stabilité** "
+        "d’un département est cette fréquence moyenne avec les autres membres de son groupe (1 = affectation certaine)."
+    )
+    ordre_clust = df_clust.sort_values(["Groupe", "Stabilité"], ascending=[True, False])
+    fig_cocl = px.imshow(
+        coclustering.loc[ordre_clust["code_departement"], ordre_clust["code_departement"]].to_numpy(),
+        x=ordre_clust["nom_departement"],
+        y=ordre_clust["nom_departement"],
+        color_continuous_scale="Blues",
+        zmin=0,
+        zmax=1,
+        aspect="auto",
+        labels=dict(color="Co-affectation"),
+        title="Fréquence de co-affectation (départements triés par groupe)"
+    )
+    fig_cocl.update_layout(height=750, xaxis_showticklabels=False)
+    st.plotly_chart(fig_cocl, use_container_width=True)
+
     st.markdown("---")
 
     # --- Contributions par axe
@@ -600,7 +766,7 @@ with tabs[5]:
 
     loadings_df = pd.DataFrame(
         pca.components_.T,
-        index=[f.replace("_pour_1000_hab", "") for f in pivot_taux.columns],
+        index=[f.replace("_pour_1000_hab", "") for f in colonnes_clust],
         columns=["Axe 1", "Axe 2"]
     )
 
@@ -627,6 +793,46 @@ with tabs[5]:
         )
         st.plotly_chart(fig_bar2, use_container_width=True)
 
+    st.markdown("---")
+
+    # --- Départements similaires
+    st.markdown("### Départements au profil similaire")
+    st.markdown(
+        "Recherche des départements les plus proches dans l’espace des indicateurs standardisés "
+        "(moyennes sur la période choisie, mêmes variables que la segmentation)."
+    )
+
+    index_sim = charger_index_similarite(version_donnees)
+    noms_sim = {code: NOMS_DEPTS.get(code, code) for code in index_sim.codes}
+
+    cols1, cols2, cols3, cols4 = st.columns(4)
+    dep_ref = cols1.selectbox(
+        "Département de référence",
+        sorted(index_sim.codes, key=lambda c: noms_sim[c]),
+        format_func=lambda c: noms_sim[c]
+    )
+    annees_sim = [int(a) for a in index_sim.years]
+    periode_sim = cols2.select_slider(
+        "Période", options=annees_sim, value=(annees_sim[0], annees_sim[-1])
+    )
+    k_sim = cols3.slider("Nombre de voisins", min_value=1, max_value=15, value=5)
+    metrique_sim = cols4.radio("Distance", METRICS, horizontal=True)
+
+    voisins = index_sim.query(
+        dep_ref, k=k_sim, year_min=periode_sim[0], year_max=periode_sim[1], metric=metrique_sim
+    )
+
+    if voisins.empty:
+        st.warning("Données insuffisantes pour ce département sur la période choisie.")
+    else:
+        voisins["Département"] = voisins["code_departement"].map(noms_sim)
+        st.dataframe(
+            voisins.rename(columns={"code_departement": "Code", "distance": "Distance"})[
+                ["Département", "Code", "Distance"]
+            ].round({"Distance": 3}),
+            hide_index=True
+        )
+
     footer()
 
 
@@ -635,67 +841,17 @@ with tabs[5]:
 with tabs[6]:
     st.title("Départements hors normes – Analyse comparative")
 
-    df_anom = df[(df["annee"] == annee_select) & (df["indicateur"] == indicateur_select)].copy()
-    df_anom = df_anom.dropna(subset=["taux_pour_mille", "insee_pop", "insee_log"])
+    df_anom, atypiques = detect_anomalies(
+        df[(df["annee"] == annee_select) & (df["indicateur"] == indicateur_select)]
+    )
 
-    if df_anom.empty:
+    if atypiques is None:
         st.warning("Pas de données suffisantes pour cette combinaison.")
     else:
-        from sklearn.ensemble import IsolationForest
-        from sklearn.preprocessing import StandardScaler
-
-        # Préparation des données
-        features = df_anom[["taux_pour_mille", "insee_pop", "insee_log"]].copy()
-        scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(features)
-
-        contamination_rate = 0.1  # seuil de détection
-        model = IsolationForest(contamination=contamination_rate, random_state=42)
-        df_anom["profil"] = model.fit_predict(X_scaled)
-        df_anom["profil"] = df_anom["profil"].map({1: "Dans la norme", -1: "Hors norme"})
-
-        # Données pour les départements hors norme
-        atypiques = df_anom[df_anom["profil"] == "Hors norme"].copy()
-        moyenne_nationale = df_anom["taux_pour_mille"].mean()
-        atypiques["Écart à la moyenne"] = (atypiques["taux_pour_mille"] - moyenne_nationale).round(2)
-        atypiques["Rang parmi les hors norme"] = atypiques["taux_pour_mille"].rank(ascending=False).astype(int)
-
-        atypiques = atypiques.rename(columns={
-            "nom_departement": "Département",
-            "taux_pour_mille": "Nombre pour 1000 habitants",
-            "insee_pop": "Population (INSEE)",
-            "insee_log": "Logements (INSEE)"
-        })
-
         # --- Affichage plein écran : CARTE ---
         st.subheader(f"Départements au profil atypique – {indicateur_select} ({annee_select})")
 
-        fig_anom_map = px.choropleth(
-            df_anom,
-            geojson=geojson_dept,
-            locations="code_departement",
-            color="profil",
-            featureidkey="properties.code",
-            hover_name="nom_departement",
-            hover_data={
-                "code_departement": False,
-                "profil": True,
-                "taux_pour_mille": ":.2f"
-            },
-            color_discrete_map={"Dans la norme": "lightgray", "Hors norme": "crimson"},
-        )
-
-        fig_anom_map.update_geos(
-            projection_type="mercator",
-            center={"lat": 46.6, "lon": 2.5},
-            fitbounds="geojson",
-            visible=False
-        )
-
-        fig_anom_map.update_layout(
-            height=750,
-            margin={"r": 0, "t": 40, "l": 0, "b": 0}
-        )
+        fig_anom_map = anomaly_map(df_anom, geojson_dept)
 
         st.plotly_chart(fig_anom_map, use_container_width=True)
 
@@ -710,12 +866,7 @@ with tabs[6]:
             "- **Méthodologie** : un algorithme de détection automatique a identifié 10 % des départements comme hors norme (Isolation Forest)."
         )
 
-        st.dataframe(
-            atypiques[[
-                "Département", "Nombre pour 1000 habitants", "Écart à la moyenne",
-                "Rang parmi les hors norme", "Population (INSEE)", "Logements (INSEE)"
-            ]].sort_values("Nombre pour 1000 habitants", ascending=False).reset_index(drop=True)
-        )
+        st.dataframe(atypiques)
 
     footer()
 
@@ -739,38 +890,62 @@ with tabs[7]:
     ⚠️ Ces prévisions sont **indicatives** : elles ne tiennent pas compte d’effets exogènes (conjoncture, politique locale, phénomènes exceptionnels).
     """)
 
-    # Agrégation annuelle
-    df_agg = df.groupby(["annee", "code_departement", "nom_departement"])["nombre"].sum().reset_index()
-    df_pivot = df_agg.pivot(index="annee", columns="code_departement", values="nombre")
-
-    from sklearn.linear_model import LinearRegression
-    forecast_2025_counts = {}
-
-    for dept in df_pivot.columns:
-        serie = df_pivot[dept].dropna()
-        if len(serie) >= 5:
-            X = np.array(serie.index).reshape(-1, 1)
-            y = serie.values
-            model = LinearRegression()
-            model.fit(X, y)
-            forecast = model.predict(np.array([[2025]]))[0]
-            forecast_2025_counts[dept] = forecast
+    # Prévision et intervalle issus de la même tendance linéaire (forme fermée, ≥ 5 années),
+    # intervalle obtenu par bootstrap des résidus
+    ic_prev = charger_incertitude(version_donnees)["previsions"]
+    df_forecast = ic_prev.dropna(subset=["prevision"]).rename(columns={"prevision": "faits_2025"})
 
-    df_forecast = pd.DataFrame(list(forecast_2025_counts.items()), columns=["code_departement", "faits_2025"])
-    df_forecast["code_departement"] = df_forecast["code_departement"].astype(str)
-
-    # Récupération des populations 2024
-    df_pop_2024 = df[df["annee"] == 2024][["code_departement", "insee_pop"]].drop_duplicates()
+    # Populations de la dernière année disponible, base de la prévision (vue sur le tenseur)
+    df_pop_2024 = pd.DataFrame(
+        {"code_departement": tenseur.codes, "insee_pop": tenseur.population_year(tenseur.years[-1])}
+    )
     df_forecast = df_forecast.merge(df_pop_2024, on="code_departement", how="left")
 
     # Calcul du nombre pour 1000 habitants
     df_forecast["nombre_pour_1000_habitants"] = (df_forecast["faits_2025"] / df_forecast["insee_pop"]) * 1000
+    df_forecast["borne_basse_1000"] = (df_forecast["borne_basse"].clip(lower=0) / df_forecast["insee_pop"]) * 1000
+    df_forecast["borne_haute_1000"] = (df_forecast["borne_haute"] / df_forecast["insee_pop"]) * 1000
 
     # Ajout des noms
     df_forecast = df_forecast.merge(
         df[["code_departement", "nom_departement"]].drop_duplicates(), on="code_departement"
     )
 
+    # Précision historique de la tendance linéaire (backtest glissant à horizon 1 an)
+    backtest = charger_backtest(version_donnees)
+    bt_dept = backtest["departement"]
+    df_forecast = df_forecast.merge(
+        bt_dept[bt_dept["modele"] == "Tendance linéaire"][["code_departement", "mape"]],
+        on="code_departement", how="left"
+    )
+
+    st.subheader("Précision historique des modèles")
+    st.markdown(
+        "Chaque prévision est rejouée à partir de chaque année passée (au moins 5 années d’historique) "
+        "puis comparée à la valeur observée l’année suivante. Les badges indiquent l’**erreur absolue "
+        "moyenne en pourcentage (MAPE)** médiane sur l’ensemble des départements, comparée à deux références : "
+        "**naïf** (reconduction de la dernière valeur) et **dérive** (prolongation de la pente moyenne)."
+    )
+
+    mape_modeles = bt_dept.groupby("modele")["mape"].median()
+    meilleur = mape_modeles.idxmin()
+    cols_bt = st.columns(len(MODELS))
+    for col, modele in zip(cols_bt, MODELS):
+        col.metric(
+            f"{modele}{' ✅' if modele == meilleur else ''}",
+            f"{mape_modeles[modele]:.1f} %",
+            delta=None if modele == "Tendance linéaire"
+            else f"{mape_modeles[modele] - mape_modeles['Tendance linéaire']:+.1f} pt vs tendance",
+            delta_color="off"
+        )
+
+    with st.expander(f"Précision par département – {indicateur_select}"):
+        bt_ind = backtest["departement_indicateur"]
+        bt_ind = bt_ind[bt_ind["indicateur"] == indicateur_select]
+        table_bt = bt_ind.pivot(index="code_departement", columns="modele", values="mape")[list(MODELS)]
+        table_bt.index = table_bt.index.map(lambda c: NOMS_DEPTS.get(c, c))
+        st.dataframe(table_bt.round(1).rename_axis("Département"))
+
     # --- Carte
     st.subheader("Carte des prévisions départementales")
 
@@ -781,6 +956,8 @@ with tabs[7]:
         color="nombre_pour_1000_habitants",
         featureidkey="properties.code",
         hover_name="nom_departement",
+        hover_data={"code_departement": False, "nombre_pour_1000_habitants": ":.2f", "mape": ":.1f"},
+        labels={"mape": "MAPE historique (%)"},
         color_continuous_scale="Oranges",
         title="Prévision 2025 – Nombre estimé pour 1000 habitants"
     )
@@ -804,13 +981,17 @@ with tabs[7]:
     st.subheader("Départements les plus concernés")
 
     top_pred = df_forecast.sort_values("nombre_pour_1000_habitants", ascending=False).head(10)
+    top_pred["erreur_haute"] = top_pred["borne_haute_1000"] - top_pred["nombre_pour_1000_habitants"]
+    top_pred["erreur_basse"] = top_pred["nombre_pour_1000_habitants"] - top_pred["borne_basse_1000"]
     fig_bar_pred = px.bar(
         top_pred,
         x="nom_departement",
         y="nombre_pour_1000_habitants",
+        error_y="erreur_haute",
+        error_y_minus="erreur_basse",
         color="nombre_pour_1000_habitants",
         color_continuous_scale="Oranges",
-        title="Top 10 départements – Nombre estimé pour 1000 habitants (2025)",
+        title=f"Top 10 départements – Nombre estimé pour 1000 habitants (2025, intervalle à {BOOTSTRAP_CONFIANCE * 100:.0f} %)",
         labels={
             "nom_departement": "Département",
             "nombre_pour_1000_habitants": "Nombre pour 1000 habitants"
@@ -825,6 +1006,84 @@ with tabs[7]:
 
     footer()
 
+
+# --- 8. CORRÉLATIONS ENTRE INDICATEURS ---
+with tabs[8]:
+    st.title("Corrélations et co-mouvements entre indicateurs")
+
+    st.markdown("""
+    Cette vue mesure dans quelle mesure les indicateurs de délinquance **varient ensemble** d’un département à l’autre.
+
+    **Mesures disponibles :**
+    - **Corrélation de Pearson / Spearman** : les départements où un indicateur est élevé le sont-ils aussi pour l’autre ?
+      (niveaux en nombre pour 1000 habitants, année sélectionnée),
+    - **Co-mouvement annuel** : corrélation des variations relatives d’une année sur l’autre,
+    - **Concordance des évolutions** : part des départements où les deux indicateurs évoluent dans le même sens.
+
+    Les matrices sont précalculées pour toutes les années ; seuls les départements renseignés pour chaque paire d’indicateurs sont retenus.
+    """)
+
+    correlations = charger_correlations(version_donnees)
+    indicateurs_corr = correlations["indicateurs"]
+
+    col_mesure, col_periode = st.columns([2, 1])
+    mesures = {
+        "Corrélation de Pearson": ("pearson", None),
+        "Corrélation de Spearman": ("spearman", None),
+        "Co-mouvement annuel": ("co_mouvement", "co_mouvement_global"),
+        "Concordance des évolutions": ("concordance", "concordance_global"),
+    }
+    mesure = col_mesure.radio("Mesure", list(mesures), horizontal=True)
+    cle, cle_globale = mesures[mesure]
+    toutes_annees = col_periode.checkbox("Toutes années confondues", disabled=cle_globale is None)
+
+    if cle_globale is None:
+        periodes = correlations["annees"]
+        libelle = f"{annee_select}"
+    else:
+        periodes = correlations["transitions"]
+        libelle = (f"{correlations['annees'][0]}–{correlations['annees'][-1]}" if toutes_annees
+                   else f"{annee_select - 1} → {annee_select}")
+
+    if cle_globale is not None and toutes_annees:
+        matrice = correlations[cle_globale]
+    elif annee_select in periodes:
+        matrice = correlations[cle][periodes.index(annee_select)]
+    else:
+        matrice = None
+
+    if matrice is None:
+        st.warning("Aucune évolution disponible pour l’année sélectionnée (première année de la série).")
+    else:
+        concordance = cle.startswith("concordance")
+        fig_corr = px.imshow(
+            matrice,
+            x=indicateurs_corr,
+            y=indicateurs_corr,
+            color_continuous_scale="RdBu_r",
+            zmin=0 if concordance else -1,
+            zmax=1,
+            aspect="auto",
+            labels=dict(color="Part" if concordance else "Corrélation"),
+            title=f"{mesure} – {libelle}"
+        )
+        fig_corr.update_layout(height=750)
+        st.plotly_chart(fig_corr, use_container_width=True)
+
+        # Paires les plus liées
+        st.subheader("Paires d’indicateurs les plus liées")
+        i, j = np.triu_indices(len(indicateurs_corr), k=1)
+        paires = pd.DataFrame({
+            "Indicateur 1": np.array(indicateurs_corr)[i],
+            "Indicateur 2": np.array(indicateurs_corr)[j],
+            mesure: matrice[i, j],
+        }).dropna()
+        intensite = (paires[mesure] - 0.5).abs() if concordance else paires[mesure].abs()
+        paires = paires.loc[intensite.sort_values(ascending=False).index].head(10)
+        st.dataframe(paires.round(3), hide_index=True)
+
+    footer()
+
 	
 
 
@@ -0,0 +1,68 @@
+from collections import defaultdict
+
+import numpy as np
+from scipy import sparse
+
+SCHEMA_VERSION = 1  # à incrémenter lorsque les résultats persistés changent
+
+
+def _rings(geometry):
+    if geometry["type"] == "Polygon":
+        polygons = [geometry["coordinates"]]
+    elif geometry["type"] == "MultiPolygon":
+        polygons = geometry["coordinates"]
+    else:
+        return
+    for polygon in polygons:
+        yield from polygon
+
+
+class Adjacency:
+    """Contiguïté (« reine ») entre départements : deux départements sont voisins
+    dès qu'ils partagent au moins un sommet de leurs contours."""
+
+    def __init__(self, codes, binary):
+        self.codes = list(codes)
+        self.binary = binary.tocsr()
+        self._pos = {code: i for i, code in enumerate(self.codes)}
+
+    @classmethod
+    def from_geojson(cls, geojson, key="code", precision=5):
+        features = sorted(geojson["features"], key=lambda f: f["properties"][key])
+        codes = [f["properties"][key] for f in features]
+
+        # Sommet arrondi -> départements qui le partagent
+        vertices = defaultdict(set)
+        for i, feature in enumerate(features):
+            for ring in _rings(feature["geometry"]):
+                for lon, lat, *_ in ring:
+                    vertices[(round(lon, precision), round(lat, precision))].add(i)
+
+        pairs = set()
+        for owners in vertices.values():
+            if len(owners) > 1:
+                owners = sorted(owners)
+                pairs.update((a, b) for a in owners for b in owners if a != b)
+
+        n = len(codes)
+        rows, cols = (np.array(x, dtype=np.int32) for x in zip(*pairs)) if pairs else ([], [])
+        binary = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(n, n))
+        return cls(codes, binary)
+
+    def subset(self, codes):
+        """Restriction aux départements donnés, dans l'ordre donné."""
+        idx = [self._pos[c] for c in codes]
+        return Adjacency(codes, self.binary[idx][:, idx])
+
+    @property
+    def cardinalities(self):
+        return np.asarray(self.binary.sum(axis=1)).ravel().astype(int)
+
+    def row_standardized(self):
+        card = self.cardinalities
+        inv = np.divide(1.0, card, out=np.zeros(len(card)), where=card > 0)
+        return sparse.diags(inv) @ self.binary
+
+    def neighbours(self, code):
+        row = self.binary[self._pos[code]]
+        return [self.codes[j] for j in row.indices]
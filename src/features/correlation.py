@@ -0,0 +1,96 @@
+import warnings
+
+import numpy as np
+
+METHODS = ("pearson", "spearman")
+SCHEMA_VERSION = 2  # à incrémenter lorsque les résultats persistés changent
+
+
+def _correlation(n, sx, sy, sxx, syy, sxy):
+    # Corrélation de Pearson à partir des sommes de chaque paire (au moins 3 départements)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = n * sxy - sx * sy
+        var = (n * sxx - sx ** 2) * (n * syy - sy ** 2)
+        r = cov / np.sqrt(var)
+    r[n < 3] = np.nan
+    return np.clip(r, -1.0, 1.0)
+
+
+def pairwise_correlation(X):
+    """Corrélation de Pearson entre colonnes, sur les départements renseignés pour chaque paire,
+    pour toutes les années à la fois : (… × départements × indicateurs) -> (… × indicateurs × indicateurs)."""
+    M = np.isfinite(X).astype(float)
+    X0 = np.where(M > 0, X, 0.0)
+
+    n = np.einsum("...di,...dj->...ij", M, M)
+    sx = np.einsum("...di,...dj->...ij", X0, M)
+    sxx = np.einsum("...di,...dj->...ij", X0 ** 2, M)
+    sxy = np.einsum("...di,...dj->...ij", X0, X0)
+    return _correlation(n, sx, np.swapaxes(sx, -1, -2), sxx, np.swapaxes(sxx, -1, -2), sxy)
+
+
+def _pairwise_ranks(X):
+    """Rangs moyens de chaque indicateur parmi les départements renseignés pour les deux
+    indicateurs de la paire : (… × départements × indicateurs) -> (… × départements × i × j)."""
+    M = np.isfinite(X).astype(float)
+    with np.errstate(invalid="ignore"):
+        below = (X[..., None, :, :] < X[..., :, None, :]).astype(float)
+        equal = (X[..., None, :, :] == X[..., :, None, :]).astype(float)
+    # Comptes restreints aux départements `e` renseignés pour l'indicateur j ;
+    # `equal` inclut le département lui-même, d'où le rang moyen en cas d'égalité
+    less = np.einsum("...dei,...ej->...dij", below, M)
+    ties = np.einsum("...dei,...ej->...dij", equal, M)
+    return less + (ties + 1) / 2
+
+
+def pairwise_spearman(X):
+    """Corrélation de Spearman entre colonnes : les rangs sont recalculés sur les seuls
+    départements renseignés pour les deux indicateurs de chaque paire."""
+    M = np.isfinite(X).astype(float)
+    P = M[..., :, None] * M[..., None, :]
+    A = np.where(P > 0, _pairwise_ranks(X), 0.0)
+    B = np.swapaxes(A, -1, -2)
+
+    n = P.sum(axis=-3)
+    sx, sy = A.sum(axis=-3), B.sum(axis=-3)
+    sxx, syy = (A ** 2).sum(axis=-3), (B ** 2).sum(axis=-3)
+    sxy = (A * B).sum(axis=-3)
+    return _correlation(n, sx, sy, sxx, syy, sxy)
+
+
+def co_movement(X):
+    """Variations annuelles relatives (année N-1 -> N) et part des départements
+    dont les deux indicateurs évoluent dans le même sens."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        change = np.where(X[:-1] != 0, (X[1:] - X[:-1]) / np.abs(X[:-1]), np.nan)
+
+    sign = np.sign(change)
+    M = np.isfinite(sign).astype(float)
+    S = np.where(M > 0, sign, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        concordance = (np.einsum("ydi,ydj->yij", S, S) / np.einsum("ydi,ydj->yij", M, M) + 1) / 2
+    return change, concordance
+
+
+def correlation_engine(tensor, field="taux_pour_mille"):
+    """Matrices de corrélation (Pearson, Spearman) par année et de co-mouvement
+    par transition annuelle, plus leurs versions toutes années confondues."""
+    X = tensor.by_year(field)
+    years, indicators = tensor.years, tensor.indicators
+    change, concordance = co_movement(X)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        concordance_global = np.nanmean(concordance, axis=0)
+
+    return {
+        "annees": years,
+        "transitions": years[1:],
+        "indicateurs": indicators,
+        "pearson": pairwise_correlation(X),
+        "spearman": pairwise_spearman(X),
+        "co_mouvement": pairwise_correlation(change),
+        "concordance": concordance,
+        "co_mouvement_global": pairwise_correlation(change.reshape(-1, len(indicators))),
+        "concordance_global": concordance_global,
+    }
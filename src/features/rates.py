@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+# Dénominateurs disponibles dans le fichier : population et logements INSEE
+DENOMINATEURS = {"population": "insee_pop", "logements": "insee_log"}
+TOLERANCE = 0.01  # écart relatif toléré entre taux publié et taux recalculé
+SCHEMA_VERSION = 1  # à incrémenter lorsque les résultats persistés changent
+
+
+def population_vintage(df, vintage=None):
+    """Population de référence de chaque ligne.
+
+    - None : la population publiée avec chaque année (colonne `insee_pop`) ;
+    - une année : la population de cette année pour chaque département, appliquée à toutes les années ;
+    - un dictionnaire ou une Series code département -> population : une source externe.
+    """
+    if vintage is None:
+        return df["insee_pop"]
+    if isinstance(vintage, (int, np.integer)):
+        ref = df[df["annee"] == vintage].groupby("code_departement")["insee_pop"].first()
+        if ref.empty:
+            raise ValueError(f"Aucune population disponible pour le millésime {vintage}")
+        return df["code_departement"].map(ref)
+    return df["code_departement"].map(pd.Series(vintage))
+
+
+def per_thousand(counts, denominator):
+    counts = np.asarray(counts, dtype=float)
+    denominator = np.asarray(denominator, dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(denominator > 0, counts / denominator * 1000, np.nan)
+
+
+def with_rates(df, vintage=None, tolerance=TOLERANCE):
+    """Ajoute les taux pour 1000 recalculés à partir de `nombre`, pour toutes les lignes à la fois.
+
+    Colonnes ajoutées :
+    - `taux_pop_recalcule` / `taux_log_recalcule` : pour 1000 habitants / pour 1000 logements ;
+    - `denominateur_publie` : dénominateur retenu par la publication pour l'indicateur
+      (celui qui reproduit le mieux les taux publiés) ;
+    - `ecart_taux_publie` : écart relatif entre le taux publié et le taux recalculé correspondant ;
+    - `taux_divergent` : écart supérieur à la tolérance.
+    """
+    df = df.copy()
+    df["taux_pop_recalcule"] = per_thousand(df["nombre"], population_vintage(df, vintage))
+    df["taux_log_recalcule"] = per_thousand(df["nombre"], df["insee_log"])
+
+    # Écarts relatifs avec la population publiée (et non le millésime choisi) : on contrôle la publication
+    published = df["taux_pour_mille"].to_numpy(dtype=float)
+    recomputed = {
+        name: per_thousand(df["nombre"], df[column]) for name, column in DENOMINATEURS.items()
+    }
+    with np.errstate(invalid="ignore", divide="ignore"):
+        gaps = {
+            name: np.where(values != 0, np.abs(published - values) / values, np.nan)
+            for name, values in recomputed.items()
+        }
+
+    # Un dénominateur par indicateur : celui dont l'écart médian est le plus faible
+    medians = pd.DataFrame(gaps).groupby(df["indicateur"].to_numpy()).median()
+    choice = medians.fillna(np.inf).idxmin(axis=1)
+    df["denominateur_publie"] = df["indicateur"].map(choice)
+
+    use_log = (df["denominateur_publie"] == "logements").to_numpy()
+    df["ecart_taux_publie"] = np.where(use_log, gaps["logements"], gaps["population"])
+    df["taux_divergent"] = df["ecart_taux_publie"] > tolerance
+    return df
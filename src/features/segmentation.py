@@ -0,0 +1,31 @@
+import pandas as pd
+from sklearn.cluster import KMeans
+from sklearn.decomposition import PCA
+from sklearn.preprocessing import StandardScaler
+
+
+def min_indicators(n_indicators, min_coverage=0.8):
+    """Nombre minimal d'indicateurs renseignés pour retenir un département (arrondi inférieur)."""
+    return int(n_indicators * min_coverage)
+
+
+def segmentation_features(tensor, min_coverage=0.8):
+    """Moyenne par département de chaque indicateur (nombre pour 1000 habitants), toutes années confondues."""
+    pivot_taux = pd.DataFrame(
+        tensor.mean_over_years("taux_pour_mille"),
+        index=pd.Index(tensor.codes, name="code_departement"),
+        columns=[f"{col}_pour_1000_hab" for col in tensor.indicators]
+    )
+    return pivot_taux.dropna(thresh=min_indicators(pivot_taux.shape[1], min_coverage))
+
+
+def fit_segmentation(X, n_clusters=4, random_state=42):
+    """Standardisation, ACP à deux composantes puis K-means : renvoie (groupes, coordonnées, ACP)."""
+    X_scaled = StandardScaler().fit_transform(X)
+
+    pca = PCA(n_components=2)
+    X_pca = pca.fit_transform(X_scaled)
+
+    kmeans = KMeans(n_clusters=n_clusters, random_state=random_state)
+    labels = kmeans.fit_predict(X_pca)
+    return labels, X_pca, pca
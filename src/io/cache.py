@@ -0,0 +1,50 @@
+import hashlib
+import json
+import pickle
+from pathlib import Path
+
+# Répertoire des artefacts calculés (non versionné)
+CACHE_ROOT = Path(__file__).resolve().parents[2] / "data" / "cache"
+
+
+def dataset_version(path, chunk_size=1 << 20):
+    """Empreinte courte du fichier de données : change dès que son contenu change."""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()[:12]
+
+
+def cache_dir(version):
+    path = CACHE_ROOT / version
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def artifact_key(name, schema=1, params=None):
+    """Nom de fichier d'un artefact : nom, version du code qui le produit et empreinte des paramètres.
+
+    `schema` est à incrémenter dès que le moteur change ses résultats ; les anciens fichiers
+    ne sont alors plus relus.
+    """
+    params = json.dumps(params or {}, sort_keys=True, default=str)
+    return f"{name}_v{schema}_{hashlib.sha1(params.encode('utf-8')).hexdigest()[:8]}"
+
+
+def cached_artifact(name, version, build, schema=1, params=None):
+    """Charge l'artefact `name` de la version donnée, ou le construit et le persiste.
+
+    La clé combine la version des données, celle du moteur (`schema`) et les paramètres de calcul.
+    """
+    path = cache_dir(version) / f"{artifact_key(name, schema, params)}.pkl"
+    if path.exists():
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    obj = build()
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp.replace(path)
+    return obj
@@ -0,0 +1,19 @@
+import json
+from pathlib import Path
+
+import requests
+
+URL_GEOJSON_DEPTS = "https://france-geojson.gregoiredavid.fr/repo/departements.geojson"
+GEOJSON_DEPTS = Path(__file__).resolve().parents[2] / "data" / "departements.geojson"
+
+
+def load_geojson(url=URL_GEOJSON_DEPTS, path=GEOJSON_DEPTS):
+    """Contours des départements, téléchargés une seule fois puis lus depuis le disque."""
+    path = Path(path)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        response = requests.get(url, timeout=60)
+        response.raise_for_status()
+        path.write_bytes(response.content)
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,61 @@
+from pathlib import Path
+
+import pandas as pd
+
+DATA_FILE = Path(__file__).resolve().parents[2] / "donnee-dep-data.gouv-2024-geographie2024-produit-le2025-03-14.csv"
+
+# Noms des départements
+NOMS_DEPTS = {
+    "01": "Ain", "02": "Aisne", "03": "Allier", "04": "Alpes-de-Haute-Provence", "05": "Hautes-Alpes",
+    "06": "Alpes-Maritimes", "07": "Ardèche", "08": "Ardennes", "09": "Ariège", "10": "Aube",
+    "11": "Aude", "12": "Aveyron", "13": "Bouches-du-Rhône", "14": "Calvados", "15": "Cantal",
+    "16": "Charente", "17": "Charente-Maritime", "18": "Cher", "19": "Corrèze", "2A": "Corse-du-Sud",
+    "2B": "Haute-Corse", "21": "Côte-d'Or", "22": "Côtes-d'Armor", "23": "Creuse", "24": "Dordogne",
+    "25": "Doubs", "26": "Drôme", "27": "Eure", "28": "Eure-et-Loir", "29": "Finistère",
+    "30": "Gard", "31": "Haute-Garonne", "32": "Gers", "33": "Gironde", "34": "Hérault",
+    "35": "Ille-et-Vilaine", "36": "Indre", "37": "Indre-et-Loire", "38": "Isère", "39": "Jura",
+    "40": "Landes", "41": "Loir-et-Cher", "42": "Loire", "43": "Haute-Loire", "44": "Loire-Atlantique",
+    "45": "Loiret", "46": "Lot", "47": "Lot-et-Garonne", "48": "Lozère", "49": "Maine-et-Loire",
+    "50": "Manche", "51": "Marne", "52": "Haute-Marne", "53": "Mayenne", "54": "Meurthe-et-Moselle",
+    "55": "Meuse", "56": "Morbihan", "57": "Moselle", "58": "Nièvre", "59": "Nord",
+    "60": "Oise", "61": "Orne", "62": "Pas-de-Calais", "63": "Puy-de-Dôme", "64": "Pyrénées-Atlantiques",
+    "65": "Hautes-Pyrénées", "66": "Pyrénées-Orientales", "67": "Bas-Rhin", "68": "Haut-Rhin", "69": "Rhône",
+    "70": "Haute-Saône", "71": "Saône-et-Loire", "72": "Sarthe", "73": "Savoie", "74": "Haute-Savoie",
+    "75": "Paris", "76": "Seine-Maritime", "77": "Seine-et-Marne", "78": "Yvelines", "79": "Deux-Sèvres",
+    "80": "Somme", "81": "Tarn", "82": "Tarn-et-Garonne", "83": "Var", "84": "Vaucluse",
+    "85": "Vendée", "86": "Vienne", "87": "Haute-Vienne", "88": "Vosges", "89": "Yonne",
+    "90": "Territoire de Belfort", "91": "Essonne", "92": "Hauts-de-Seine", "93": "Seine-Saint-Denis",
+    "94": "Val-de-Marne", "95": "Val-d'Oise"
+}
+
+# Noms des régions
+NOMS_REGIONS = {
+    "84": "Auvergne-Rhône-Alpes", "27": "Bourgogne-Franche-Comté", "53": "Bretagne",
+    "24": "Centre-Val de Loire", "94": "Corse", "44": "Grand Est", "32": "Hauts-de-France",
+    "11": "Île-de-France", "28": "Normandie", "75": "Nouvelle-Aquitaine",
+    "76": "Occitanie", "52": "Pays de la Loire", "93": "Provence-Alpes-Côte d'Azur"
+}
+
+
+def load_dataset(path=DATA_FILE):
+    """Lecture et nettoyage du fichier départemental (France métropolitaine et Corse)."""
+    df = pd.read_csv(path, sep=';', encoding='utf-8')
+
+    # Nettoyage des colonnes
+    df.columns = df.columns.str.strip().str.lower().str.replace(" ", "_")
+    df["indicateur"] = df["indicateur"].str.strip()
+    df["code_departement"] = df["code_departement"].astype(str).str.zfill(2)
+
+    # Supprimer les DROM : ne garder que la France métropolitaine + Corse
+    df = df[df["code_departement"].isin([f"{i:02d}" for i in range(1, 96)] + ["2A", "2B"])]
+
+    # Nettoyage des taux : gérer les virgules et pourcentages
+    df["taux_pour_mille"] = df["taux_pour_mille"].astype(str).str.strip()
+    df["taux_pour_mille"] = df["taux_pour_mille"].apply(
+        lambda x: float(x.replace(",", ".").replace("%", "")) / 100 if "%" in x else float(x.replace(",", "."))
+    )
+
+    df["nom_departement"] = df["code_departement"].map(NOMS_DEPTS)
+    df["code_region"] = df["code_region"].astype(str)
+    df["nom_region"] = df["code_region"].map(NOMS_REGIONS)
+    return df
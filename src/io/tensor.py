@@ -0,0 +1,163 @@
+import json
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.io.cache import cache_dir
+
+FIELDS = ("nombre", "taux_pour_mille")
+KEYS = ["code_departement", "annee", "indicateur"]
+LABELS = "labels.json"
+SCHEMA_VERSION = 1  # à incrémenter lorsque le format des tableaux persistés change
+
+
+class CrimeTensor:
+    """Jeu de données sous forme de tableaux denses indexés par codes entiers.
+
+    - `nombre`, `taux_pour_mille` : (département × année × indicateur) ;
+    - `population` : (département × année) ;
+    - `mask` : True lorsque la combinaison figure dans le fichier source.
+
+    Les tableaux sont persistés en `.npy` et relus en mémoire partagée (`mmap_mode="r"`) :
+    les méthodes de découpage renvoient des vues, sans copie.
+    """
+
+    def __init__(self, codes, years, indicators, regions, nombre, taux_pour_mille, population, mask):
+        self.codes = list(codes)
+        self.years = [int(y) for y in years]
+        self.indicators = list(indicators)
+        self.regions = list(regions)
+        self.nombre = nombre
+        self.taux_pour_mille = taux_pour_mille
+        self.population = population
+        self.mask = mask
+        self._dept = {code: i for i, code in enumerate(self.codes)}
+        self._year = {year: i for i, year in enumerate(self.years)}
+        self._indicator = {ind: i for i, ind in enumerate(self.indicators)}
+
+    @classmethod
+    def from_frame(cls, df):
+        # Une cellule par combinaison : un doublon serait écrasé sans avertissement
+        doublons = df.duplicated(KEYS)
+        if doublons.any():
+            exemple = " / ".join(map(str, df.loc[doublons, KEYS].iloc[0]))
+            raise ValueError(
+                f"{int(doublons.sum())} ligne(s) en double sur {', '.join(KEYS)} (ex. {exemple}) : "
+                "agréger le fichier avant de construire le tenseur"
+            )
+
+        codes = sorted(df["code_departement"].unique())
+        years = sorted(df["annee"].unique())
+        indicators = sorted(df["indicateur"].unique())
+
+        d = pd.Index(codes).get_indexer(df["code_departement"])
+        y = pd.Index(years).get_indexer(df["annee"])
+        i = pd.Index(indicators).get_indexer(df["indicateur"])
+
+        shape = (len(codes), len(years), len(indicators))
+        arrays = {}
+        for field in FIELDS:
+            arrays[field] = np.full(shape, np.nan)
+            arrays[field][d, y, i] = df[field].to_numpy(dtype=float)
+        population = np.full(shape[:2], np.nan)
+        population[d, y] = df["insee_pop"].to_numpy(dtype=float)
+        mask = np.zeros(shape, dtype=bool)
+        mask[d, y, i] = True
+
+        regions = df.drop_duplicates("code_departement").set_index("code_departement")["code_region"]
+        return cls(codes, years, indicators, regions.reindex(codes).astype(str), mask=mask,
+                   population=population, **arrays)
+
+    def save(self, directory):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for field in FIELDS:
+            np.save(directory / f"{field}.npy", getattr(self, field))
+        np.save(directory / "population.npy", self.population)
+        np.save(directory / "mask.npy", self.mask)
+        # Libellés écrits en dernier : leur présence signale un tenseur complet
+        labels = {"codes": self.codes, "years": self.years, "indicators": self.indicators, "regions": self.regions}
+        (directory / LABELS).write_text(json.dumps(labels, ensure_ascii=False), encoding="utf-8")
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        directory = Path(directory)
+        labels = json.loads((directory / LABELS).read_text(encoding="utf-8"))
+        arrays = {
+            name: np.load(directory / f"{name}.npy", mmap_mode=mmap_mode)
+            for name in (*FIELDS, "population", "mask")
+        }
+        return cls(labels["codes"], labels["years"], labels["indicators"], labels["regions"], **arrays)
+
+    # --- Correspondances libellés -> codes entiers
+
+    def dept_index(self, code):
+        return self._dept[code]
+
+    def year_index(self, year):
+        return self._year[int(year)]
+
+    def indicator_index(self, indicator):
+        return self._indicator[indicator]
+
+    # --- Découpages sans copie
+
+    def field(self, name):
+        if name not in FIELDS:
+            raise ValueError(f"Champ inconnu : {name!r} (attendu : {', '.join(FIELDS)})")
+        return getattr(self, name)
+
+    def year_indicator(self, year, indicator, field="taux_pour_mille"):
+        """Valeurs de tous les départements pour une année et un indicateur : (département,)."""
+        return self.field(field)[:, self.year_index(year), self.indicator_index(indicator)]
+
+    def department(self, code, field="taux_pour_mille"):
+        """Toutes les valeurs d'un département : (année × indicateur)."""
+        return self.field(field)[self.dept_index(code)]
+
+    def indicator(self, indicator, field="taux_pour_mille"):
+        """Toutes les valeurs d'un indicateur : (département × année)."""
+        return self.field(field)[:, :, self.indicator_index(indicator)]
+
+    def by_year(self, field="taux_pour_mille"):
+        """Vue (année × département × indicateur)."""
+        return np.moveaxis(self.field(field), 1, 0)
+
+    def population_year(self, year):
+        """Population INSEE de tous les départements pour une année : (département,)."""
+        return self.population[:, self.year_index(year)]
+
+    # --- Réorganisations et agrégats
+
+    def slices(self, field="taux_pour_mille"):
+        """Une ligne par tranche année × indicateur (ordre année puis indicateur), une colonne par département."""
+        values = np.moveaxis(self.field(field), 0, -1).reshape(-1, len(self.codes))
+        index = pd.MultiIndex.from_product([self.years, self.indicators], names=["annee", "indicateur"])
+        return pd.DataFrame(values, index=index, columns=self.codes)
+
+    def totals(self, field="nombre"):
+        """Somme sur les indicateurs : (département × année), NaN si rien n'est observé."""
+        values = self.field(field)
+        return np.where(self.mask.any(axis=-1), np.nansum(values, axis=-1), np.nan)
+
+    def mean_over_years(self, field="taux_pour_mille", year_min=None, year_max=None):
+        """Moyenne sur une plage d'années : (département × indicateur)."""
+        years = np.asarray(self.years)
+        keep = np.ones(len(years), dtype=bool)
+        if year_min is not None:
+            keep &= years >= year_min
+        if year_max is not None:
+            keep &= years <= year_max
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            return np.nanmean(self.field(field)[:, keep], axis=1)
+
+
+def cached_tensor(version, build_frame):
+    """Tenseur de la version donnée, construit au premier appel puis relu en mémoire partagée."""
+    directory = cache_dir(version) / f"tenseur_v{SCHEMA_VERSION}"
+    if not (directory / LABELS).exists():
+        CrimeTensor.from_frame(build_frame()).save(directory)
+    return CrimeTensor.load(directory)
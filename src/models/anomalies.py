@@ -0,0 +1,41 @@
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import StandardScaler
+
+FEATURES = ["taux_pour_mille", "insee_pop", "insee_log"]
+COLONNES_TABLE = [
+    "Département", "Nombre pour 1000 habitants", "Écart à la moyenne",
+    "Rang parmi les hors norme", "Population (INSEE)", "Logements (INSEE)"
+]
+
+
+def detect_anomalies(df_slice, contamination=0.1, random_state=42):
+    """Isolation Forest sur le taux, la population et les logements d'une année × indicateur.
+
+    Renvoie le sous-ensemble exploitable avec la colonne `profil`, et le tableau des
+    départements hors norme (None si les données sont insuffisantes).
+    """
+    df_anom = df_slice.dropna(subset=FEATURES).copy()
+    if df_anom.empty:
+        return df_anom, None
+
+    # Préparation des données
+    X_scaled = StandardScaler().fit_transform(df_anom[FEATURES])
+
+    model = IsolationForest(contamination=contamination, random_state=random_state)
+    df_anom["profil"] = model.fit_predict(X_scaled)
+    df_anom["profil"] = df_anom["profil"].map({1: "Dans la norme", -1: "Hors norme"})
+
+    # Données pour les départements hors norme
+    atypiques = df_anom[df_anom["profil"] == "Hors norme"].copy()
+    moyenne_nationale = df_anom["taux_pour_mille"].mean()
+    atypiques["Écart à la moyenne"] = (atypiques["taux_pour_mille"] - moyenne_nationale).round(2)
+    atypiques["Rang parmi les hors norme"] = atypiques["taux_pour_mille"].rank(ascending=False).astype(int)
+
+    atypiques = atypiques.rename(columns={
+        "nom_departement": "Département",
+        "taux_pour_mille": "Nombre pour 1000 habitants",
+        "insee_pop": "Population (INSEE)",
+        "insee_log": "Logements (INSEE)"
+    })
+    table = atypiques[COLONNES_TABLE].sort_values("Nombre pour 1000 habitants", ascending=False)
+    return df_anom, table.reset_index(drop=True)
@@ -0,0 +1,130 @@
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+from src.models.parallel import parallel_map
+
+MODELS = ("Tendance linéaire", "Naïf", "Dérive")
+MIN_TRAIN_YEARS = 5  # même seuil que la régression de l'onglet Prévisions
+SCHEMA_VERSION = 2  # à incrémenter lorsque les résultats persistés changent
+
+
+def department_series(tensor, field="nombre"):
+    """Une ligne par département (tous indicateurs cumulés), une colonne par année."""
+    return pd.DataFrame(
+        tensor.totals(field), index=pd.Index(tensor.codes, name="code_departement"), columns=tensor.years
+    )
+
+
+def department_indicator_series(tensor, field="nombre"):
+    """Une ligne par département × indicateur, une colonne par année."""
+    values = np.moveaxis(tensor.field(field), 2, 1).reshape(-1, len(tensor.years))
+    index = pd.MultiIndex.from_product([tensor.codes, tensor.indicators], names=["code_departement", "indicateur"])
+    return pd.DataFrame(values, index=index, columns=tensor.years)
+
+
+def _last_valid(mask):
+    # Indice de la dernière / première observation disponible le long du dernier axe
+    t = mask.shape[-1]
+    last = t - 1 - np.argmax(mask[..., ::-1], axis=-1)
+    first = np.argmax(mask, axis=-1)
+    return first, last
+
+
+def linear_trend(t, y, mask, target):
+    """Régression linéaire simple de y sur t (points retenus par `mask`, dernier axe),
+    résolue en forme fermée pour toutes les séries à la fois et évaluée en `target`."""
+    n = mask.sum(axis=-1)
+    t = np.where(mask, t, 0.0)
+    y = np.where(mask, y, 0.0)
+    sx, sy = t.sum(axis=-1), y.sum(axis=-1)
+    sxx, sxy = (t * t).sum(axis=-1), (t * y).sum(axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = (n * sxy - sx * sy) / (n * sxx - sx ** 2)
+        intercept = (sy - slope * sx) / n
+    return intercept + slope * target
+
+
+def forecast_at_cutoffs(Y, years, cutoffs, horizon=1):
+    """Prévisions des trois modèles pour chaque série et chaque année de coupure.
+
+    Y : (séries × années), NaN pour les valeurs manquantes.
+    Renvoie un tableau (modèles × séries × coupures).
+    """
+    years = np.asarray(years, dtype=float)
+    cutoffs = np.asarray(cutoffs, dtype=float)
+    target = cutoffs + horizon
+
+    # Masque d'apprentissage (séries × coupures × années)
+    train = np.isfinite(Y)[:, None, :] & (years[None, None, :] <= cutoffs[None, :, None])
+    n = train.sum(axis=-1)
+    linear = linear_trend(years[None, None, :], Y[:, None, :], train, target[None, :])
+
+    # Naïf : dernière valeur observée ; dérive : pente entre première et dernière observation
+    first, last = _last_valid(train)
+    y_first = np.take_along_axis(Y, first, axis=1)
+    y_last = np.take_along_axis(Y, last, axis=1)
+    t_first, t_last = years[first], years[last]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drift_slope = np.where(t_last > t_first, (y_last - y_first) / (t_last - t_first), 0.0)
+    naive = y_last
+    drift = y_last + drift_slope * (target[None, :] - t_last)
+
+    forecasts = np.stack([linear, naive, drift])
+    forecasts[:, n < MIN_TRAIN_YEARS] = np.nan
+    return forecasts
+
+
+def _backtest_chunk(Y, years, horizon):
+    years = np.asarray(years)
+    # Année cible cherchée par libellé : une coupure dont la cible manque n'est pas évaluée
+    target = pd.Index(years).get_indexer(years + horizon)
+    cutoffs, target = years[target >= 0], target[target >= 0]
+    forecasts = forecast_at_cutoffs(Y, years, cutoffs, horizon)
+
+    actual = Y[:, target][None]
+    err = np.abs(forecasts - actual)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ape = np.where(actual != 0, err / np.abs(actual), np.nan) * 100
+
+    evaluated = np.isfinite(err)
+    n_eval = evaluated.sum(axis=-1)
+    with np.errstate(invalid="ignore"):
+        mae = np.where(n_eval > 0, np.nansum(err, axis=-1) / n_eval, np.nan)
+        n_ape = np.isfinite(ape).sum(axis=-1)
+        mape = np.where(n_ape > 0, np.nansum(ape, axis=-1) / n_ape, np.nan)
+    return mae, mape, n_eval
+
+
+def run_backtest(wide, horizon=1, n_jobs=None, chunk_size=256):
+    """Backtest glissant (walk-forward) de chaque série (une ligne par série, une colonne
+    par année), réparti sur un pool de processus.
+
+    Renvoie un DataFrame long : clés de la série, modèle, MAE, MAPE (%) et nombre d'évaluations.
+    """
+    Y = wide.to_numpy(dtype=float)
+    years = wide.columns.to_numpy()
+
+    chunks = [Y[i:i + chunk_size] for i in range(0, len(Y), chunk_size)] or [Y]
+    results = parallel_map(_backtest_chunk, chunks, repeat(years), repeat(horizon), n_jobs=n_jobs)
+
+    mae, mape, n_eval = (np.concatenate(parts, axis=1) for parts in zip(*results))
+
+    frames = []
+    for m, model in enumerate(MODELS):
+        out = wide.index.to_frame(index=False)
+        out["modele"] = model
+        out["mae"] = mae[m]
+        out["mape"] = mape[m]
+        out["n_evaluations"] = n_eval[m]
+        frames.append(out)
+    return pd.concat(frames, ignore_index=True)
+
+
+def backtest_all(tensor, n_jobs=None):
+    """Backtests par département (tous indicateurs cumulés) et par département × indicateur."""
+    return {
+        "departement": run_backtest(department_series(tensor), n_jobs=n_jobs),
+        "departement_indicateur": run_backtest(department_indicator_series(tensor), n_jobs=n_jobs),
+    }
@@ -0,0 +1,149 @@
+import warnings
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+from scipy import sparse, stats
+
+from src.models.parallel import parallel_map
+
+SCHEMA_VERSION = 1  # à incrémenter lorsque les résultats persistés changent
+
+# Quadrants du diagramme de Moran (valeur du département / moyenne de ses voisins)
+QUADRANTS = {1: "Haut-Haut", 2: "Haut-Bas", 3: "Bas-Bas", 4: "Bas-Haut"}
+NON_SIGNIFICATIF = "Non significatif"
+CLASSES_GI = [
+    "Point chaud (99 %)", "Point chaud (95 %)", "Point chaud (90 %)", NON_SIGNIFICATIF,
+    "Point froid (90 %)", "Point froid (95 %)", "Point froid (99 %)",
+]
+
+
+def _folded_pvalue(simulated, observed):
+    # Pseudo p-valeur unilatérale dans la direction de l'observation (convention PySAL)
+    permutations = simulated.shape[-1]
+    larger = (simulated >= observed[..., None]).sum(axis=-1)
+    larger = np.where(permutations - larger < larger, permutations - larger, larger)
+    return np.where(np.isfinite(observed), (larger + 1.0) / (permutations + 1.0), np.nan)
+
+
+def _permutation_chunk(Z, W, card, permutations, seed):
+    """P-valeurs par permutations pour un lot de tranches (Z centré, tranches × départements)."""
+    rng = np.random.default_rng(seed)
+    c, n = Z.shape
+    m2 = (Z ** 2).sum(axis=1) / n
+    lag = (W @ Z.T).T
+    s0 = W.sum()
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        moran_global = (n / s0) * (Z * lag).sum(axis=1) / (m2 * n)
+        moran_local = Z * lag / m2[:, None]
+
+    # Moran global : permutations totales, toutes traitées en un seul produit creux
+    perms = rng.permuted(np.broadcast_to(np.arange(n), (permutations, n)), axis=1)
+    Zp = Z[:, perms]
+    lag_p = (W @ Zp.reshape(-1, n).T).T.reshape(Zp.shape)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sim_global = (n / s0) * (Zp * lag_p).sum(axis=-1) / (m2[:, None] * n)
+    p_global = _folded_pvalue(sim_global, moran_global)
+
+    # Moran local : permutations conditionnelles (la valeur du département reste en place),
+    # un même tirage de voisins fictifs est partagé par tous les départements
+    k_max = max(int(card.max()), 1)
+    draws = rng.permuted(np.broadcast_to(np.arange(n - 1), (permutations, n - 1)), axis=1)[:, :k_max]
+    ids = draws[None, :, :] + (draws[None, :, :] >= np.arange(n)[:, None, None])
+    weights = np.where(
+        np.arange(k_max)[None, :] < card[:, None],
+        np.divide(1.0, card, out=np.zeros(n), where=card > 0)[:, None],
+        0.0,
+    )
+    lag_local = np.einsum("cipk,ik->cip", Z[:, ids], weights)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sim_local = Z[:, :, None] * lag_local / m2[:, None, None]
+    p_local = _folded_pvalue(sim_local, moran_local)
+
+    return moran_global, p_global, moran_local, p_local, lag
+
+
+def getis_ord(X, binary):
+    """Statistique Gi* (z-score) de chaque département pour chaque tranche."""
+    n = X.shape[1]
+    W = binary + sparse.identity(n, format="csr")
+    wi = np.asarray(W.sum(axis=1)).ravel()
+    s1 = np.asarray(W.multiply(W).sum(axis=1)).ravel()
+    mean = X.mean(axis=1, keepdims=True)
+    s = np.sqrt((X ** 2).mean(axis=1, keepdims=True) - mean ** 2)
+    lag = (W @ X.T).T
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (lag - mean * wi) / (s * np.sqrt((n * s1 - wi ** 2) / (n - 1)))
+
+
+def hotspot_statistics(tensor, adjacency, field="taux_pour_mille", permutations=999, seed=42,
+                       n_jobs=None, backend="processus", chunk_size=4):
+    """Moran global / local et Getis-Ord Gi* pour toutes les tranches année × indicateur.
+
+    Renvoie deux DataFrames : `global` (une ligne par tranche) et `local`
+    (une ligne par tranche et par département).
+    """
+    present = set(tensor.codes)
+    adjacency = adjacency.subset([c for c in adjacency.codes if c in present])
+    codes = adjacency.codes
+
+    slices = tensor.slices(field)[codes]
+    X = slices.to_numpy(dtype=float)
+    missing = ~np.isfinite(X)
+
+    # Valeurs manquantes remplacées par la moyenne de la tranche (neutres pour les statistiques)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        X = np.where(missing, np.nanmean(X, axis=1, keepdims=True), X)
+    X = np.nan_to_num(X)
+    Z = X - X.mean(axis=1, keepdims=True)
+
+    W = adjacency.row_standardized().tocsr()
+    card = adjacency.cardinalities
+
+    chunks = [Z[i:i + chunk_size] for i in range(0, len(Z), chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    results = parallel_map(
+        _permutation_chunk, chunks, repeat(W), repeat(card), repeat(permutations), seeds,
+        n_jobs=n_jobs, backend=backend
+    )
+
+    moran_global, p_global, moran_local, p_local, lag = (
+        np.concatenate(parts) for parts in zip(*results)
+    )
+    gi = getis_ord(X, adjacency.binary)
+
+    glob = slices.index.to_frame(index=False)
+    glob["moran_i"] = moran_global
+    glob["p_valeur"] = p_global
+
+    n_slices, n_depts = Z.shape
+    local = pd.DataFrame({
+        "annee": np.repeat(slices.index.get_level_values("annee"), n_depts),
+        "indicateur": np.repeat(slices.index.get_level_values("indicateur"), n_depts),
+        "code_departement": np.tile(codes, n_slices),
+        "moran_local": moran_local.ravel(),
+        "p_moran_local": p_local.ravel(),
+        "quadrant": (1 + 2 * (Z < 0) + ((Z < 0) != (lag < 0))).ravel(),
+        "gi_star": gi.ravel(),
+        "p_gi_star": 2 * stats.norm.sf(np.abs(gi.ravel())),
+    })
+    local.loc[missing.ravel(), ["moran_local", "p_moran_local", "gi_star", "p_gi_star"]] = np.nan
+    return {"global": glob, "local": local}
+
+
+def lisa_classes(local, alpha=0.05):
+    """Libellé du quadrant de Moran lorsque le Moran local est significatif."""
+    labels = local["quadrant"].map(QUADRANTS)
+    return labels.where(local["p_moran_local"] <= alpha, NON_SIGNIFICATIF)
+
+
+def gi_classes(local):
+    """Points chauds / froids selon le z-score Gi* et les seuils de confiance usuels."""
+    z, p = local["gi_star"], local["p_gi_star"]
+    out = pd.Series(NON_SIGNIFICATIF, index=local.index)
+    for level, threshold in (("90 %", 0.10), ("95 %", 0.05), ("99 %", 0.01)):
+        out[(p <= threshold) & (z > 0)] = f"Point chaud ({level})"
+        out[(p <= threshold) & (z < 0)] = f"Point froid ({level})"
+    return out
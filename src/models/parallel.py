@@ -0,0 +1,17 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+BACKENDS = {"processus": ProcessPoolExecutor, "threads": ThreadPoolExecutor}
+
+
+def parallel_map(func, *iterables, n_jobs=None, backend="processus"):
+    """`map` réparti sur un pool de processus ou de threads ; séquentiel si n_jobs == 1."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend inconnu : {backend!r} (attendu : {', '.join(BACKENDS)})")
+
+    tasks = list(zip(*iterables))
+    n_jobs = n_jobs or os.cpu_count() or 1
+    if n_jobs == 1 or len(tasks) <= 1:
+        return [func(*task) for task in tasks]
+    with BACKENDS[backend](max_workers=min(n_jobs, len(tasks))) as pool:
+        return list(pool.map(func, *zip(*tasks)))
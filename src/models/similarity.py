@@ -0,0 +1,85 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from src.features.segmentation import min_indicators
+
+METRICS = ("euclidienne", "cosinus")
+SCHEMA_VERSION = 2  # à incrémenter lorsque les résultats persistés changent
+
+
+class SimilarityIndex:
+    """Index de similarité entre départements sur les profils standardisés d'indicateurs.
+
+    Les taux sont conservés sous forme d'un tableau (année × département × indicateur) :
+    un filtre sur une plage d'années se résume à une moyenne sur le premier axe,
+    puis à un calcul de distances exact et vectorisé (≈ 100 départements).
+    """
+
+    def __init__(self, codes, years, indicators, rates, min_coverage=0.8):
+        self.codes = list(codes)
+        self.years = np.asarray(years)
+        self.indicators = list(indicators)
+        self.rates = rates
+        self.min_coverage = min_coverage
+        self._pos = {code: i for i, code in enumerate(self.codes)}
+
+    @classmethod
+    def from_tensor(cls, tensor, field="taux_pour_mille", **kwargs):
+        # Copie détachée du fichier mappé : elle est persistée avec l'index
+        rates = np.array(tensor.by_year(field))
+        return cls(tensor.codes, tensor.years, tensor.indicators, rates, **kwargs)
+
+    def profiles(self, year_min=None, year_max=None):
+        """Profils standardisés sur la plage d'années, et masque des départements exploitables."""
+        mask = np.ones(len(self.years), dtype=bool)
+        if year_min is not None:
+            mask &= self.years >= year_min
+        if year_max is not None:
+            mask &= self.years <= year_max
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            means = np.nanmean(self.rates[mask], axis=0)
+
+        # Même règle que la segmentation ; la standardisation ne porte que sur les départements retenus
+        valid = np.isfinite(means).sum(axis=1) >= min_indicators(means.shape[1], self.min_coverage)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            mu = np.nanmean(means[valid], axis=0)
+            sd = np.nanstd(means[valid], axis=0)
+
+        sd = np.where(np.isfinite(sd) & (sd > 0), sd, 1.0)
+        z = np.nan_to_num((means - mu) / sd, nan=0.0)
+        return z, valid
+
+    def query(self, code, k=5, year_min=None, year_max=None, metric="euclidienne"):
+        """Les k départements les plus proches de `code`, triés par distance croissante."""
+        if metric not in METRICS:
+            raise ValueError(f"Métrique inconnue : {metric!r} (attendu : {', '.join(METRICS)})")
+
+        z, valid = self.profiles(year_min, year_max)
+        i = self._pos[code]
+        if not valid[i]:
+            return pd.DataFrame(columns=["code_departement", "distance"])
+
+        x = z[i]
+        if metric == "cosinus":
+            norms = np.linalg.norm(z, axis=1) * np.linalg.norm(x)
+            dist = 1.0 - np.divide(z @ x, norms, out=np.zeros(len(z)), where=norms > 0)
+        else:
+            dist = np.sqrt(((z - x) ** 2).sum(axis=1))
+
+        dist[~valid] = np.inf
+        dist[i] = np.inf
+        k = min(k, int(np.isfinite(dist).sum()))
+        if k == 0:
+            return pd.DataFrame(columns=["code_departement", "distance"])
+
+        nearest = np.argpartition(dist, k - 1)[:k]
+        nearest = nearest[np.argsort(dist[nearest])]
+        return pd.DataFrame({
+            "code_departement": [self.codes[j] for j in nearest],
+            "distance": dist[nearest],
+        })
@@ -0,0 +1,178 @@
+import warnings
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+from src.features.segmentation import fit_segmentation
+from src.models.backtest import MIN_TRAIN_YEARS, department_series, linear_trend
+from src.models.parallel import parallel_map
+
+N_BOOTSTRAP = 2000
+N_BOOTSTRAP_CLUSTERS = 200
+CONFIDENCE = 0.95
+SCHEMA_VERSION = 1  # à incrémenter lorsque les résultats persistés changent
+
+
+def _compact(X):
+    # Valeurs observées regroupées en début de ligne (np.sort place les NaN en dernier)
+    return np.sort(X, axis=-1), np.isfinite(X).sum(axis=-1)
+
+
+def _resample(values, n_valid, n_boot, rng):
+    """Tirages avec remise parmi les valeurs observées de chaque ligne : (lignes × tirages × largeur)."""
+    rows, width = values.shape
+    idx = (rng.random((rows, n_boot, width)) * n_valid[:, None, None]).astype(np.intp)
+    return np.take_along_axis(values[:, None, :], idx, axis=-1)
+
+
+def _bounds(samples, confidence):
+    alpha = (1 - confidence) / 2
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        return np.nanquantile(samples, [alpha, 1 - alpha], axis=-1)
+
+
+def _chunks(X, chunk_size):
+    return [X[i:i + chunk_size] for i in range(0, len(X), chunk_size)]
+
+
+def _mean_chunk(X, n_boot, confidence, seed):
+    rng = np.random.default_rng(seed)
+    values, n_valid = _compact(X)
+    draws = _resample(values, n_valid, n_boot, rng)
+    keep = np.arange(values.shape[1])[None, None, :] < n_valid[:, None, None]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(keep, draws, 0.0).sum(axis=-1) / n_valid[:, None]
+    return _bounds(means, confidence)
+
+
+def _forecast_chunk(Y, years, n_boot, confidence, seed):
+    """Intervalle de prévision à un an par bootstrap des résidus de la tendance linéaire."""
+    rng = np.random.default_rng(seed)
+    target = years.max() + 1.0
+    t = years[None, None, :]
+    observed = np.isfinite(Y)[:, None, :]
+    n_obs = observed.sum(axis=-1)[:, 0]
+
+    fitted = linear_trend(t, Y[:, None, :], observed, years[None, :])
+    point = linear_trend(t, Y[:, None, :], observed, target)[:, 0]
+
+    # Résidus corrigés des degrés de liberté consommés par la régression
+    with np.errstate(invalid="ignore", divide="ignore"):
+        residuals = (Y - fitted) * np.sqrt(n_obs / np.maximum(n_obs - 2, 1))[:, None]
+    residuals, n_res = _compact(residuals)
+
+    Y_boot = fitted[:, None, :] + _resample(residuals, n_res, n_boot, rng)
+    trend = linear_trend(t, Y_boot, observed, target)
+
+    # Aléa de l'année prévue : un résidu supplémentaire par tirage
+    idx = (rng.random((len(Y), n_boot)) * n_res[:, None]).astype(np.intp)
+    simulated = trend + np.take_along_axis(residuals, idx, axis=1)
+
+    low, high = _bounds(simulated, confidence)
+    too_short = n_obs < MIN_TRAIN_YEARS
+    return (np.where(too_short, np.nan, point), np.where(too_short, np.nan, low),
+            np.where(too_short, np.nan, high))
+
+
+def _coclustering_chunk(X, samples, n_clusters, seeds):
+    """Comptes de co-affectation (mêmes groupes) et de co-présence sur un lot de rééchantillons."""
+    n = len(X)
+    together = np.zeros((n, n))
+    present = np.zeros((n, n))
+    for idx, seed in zip(samples, seeds):
+        members, first = np.unique(idx, return_index=True)
+        labels = fit_segmentation(X[idx], n_clusters=n_clusters, random_state=int(seed))[0][first]
+        grid = np.ix_(members, members)
+        together[grid] += labels[:, None] == labels[None, :]
+        present[grid] += 1
+    return together, present
+
+
+def mean_intervals(tensor, field="taux_pour_mille", n_boot=N_BOOTSTRAP, confidence=CONFIDENCE, seed=42,
+                   n_jobs=None, backend="processus", chunk_size=16):
+    """Intervalle de confiance de la moyenne départementale pour chaque année × indicateur."""
+    wide = tensor.slices(field)
+    chunks = _chunks(wide.to_numpy(dtype=float), chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    results = parallel_map(
+        _mean_chunk, chunks, repeat(n_boot), repeat(confidence), seeds, n_jobs=n_jobs, backend=backend
+    )
+    low, high = (np.concatenate(parts) for parts in zip(*results))
+
+    out = wide.index.to_frame(index=False)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        out["moyenne"] = np.nanmean(wide.to_numpy(dtype=float), axis=1)
+    out["borne_basse"] = low
+    out["borne_haute"] = high
+    return out
+
+
+def forecast_intervals(tensor, field="nombre", n_boot=N_BOOTSTRAP, confidence=CONFIDENCE, seed=42,
+                       n_jobs=None, backend="processus", chunk_size=32):
+    """Prévision à un an de chaque département (tous indicateurs cumulés) et son intervalle."""
+    wide = department_series(tensor, field)
+    years = wide.columns.to_numpy(dtype=float)
+    chunks = _chunks(wide.to_numpy(dtype=float), chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    results = parallel_map(
+        _forecast_chunk, chunks, repeat(years), repeat(n_boot), repeat(confidence), seeds,
+        n_jobs=n_jobs, backend=backend
+    )
+    point, low, high = (np.concatenate(parts) for parts in zip(*results))
+    return pd.DataFrame({
+        "code_departement": wide.index,
+        "prevision": point,
+        "borne_basse": low,
+        "borne_haute": high,
+    })
+
+
+def coclustering_matrix(features, n_clusters=4, n_boot=N_BOOTSTRAP_CLUSTERS, seed=42,
+                        n_jobs=None, backend="processus", chunk_size=25):
+    """Fréquence à laquelle deux départements sont affectés au même groupe K-means
+    lorsqu'ils figurent tous deux dans un même rééchantillon."""
+    X = features.to_numpy(dtype=float)
+    X = np.where(np.isfinite(X), X, np.nanmean(X, axis=0))
+
+    rng = np.random.default_rng(seed)
+    samples = rng.integers(0, len(X), size=(n_boot, len(X)))
+    kmeans_seeds = rng.integers(0, 2 ** 31 - 1, size=n_boot)
+
+    results = parallel_map(
+        _coclustering_chunk, repeat(X), _chunks(samples, chunk_size), repeat(n_clusters),
+        _chunks(kmeans_seeds, chunk_size), n_jobs=n_jobs, backend=backend
+    )
+    together, present = (sum(parts) for parts in zip(*results))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        stability = together / present
+    np.fill_diagonal(stability, 1.0)
+    return pd.DataFrame(stability, index=features.index, columns=features.index)
+
+
+def cluster_stability(coclustering, labels):
+    """Stabilité de l'affectation de chaque département : co-affectation moyenne
+    avec les autres membres de son groupe de référence."""
+    labels = np.asarray(labels)
+    same = labels[:, None] == labels[None, :]
+    np.fill_diagonal(same, False)
+    S = coclustering.to_numpy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        score = np.nansum(np.where(same, S, 0.0), axis=1) / same.sum(axis=1)
+    return pd.Series(score, index=coclustering.index, name="stabilite")
+
+
+def uncertainty_all(tensor, features, n_clusters=4, n_boot=N_BOOTSTRAP, n_boot_clusters=N_BOOTSTRAP_CLUSTERS,
+                    confidence=CONFIDENCE, seed=42, n_jobs=None, backend="processus"):
+    """Intervalles des moyennes et des prévisions, et matrice de co-affectation des groupes."""
+    seeds = np.random.SeedSequence(seed).generate_state(3)
+    options = dict(n_jobs=n_jobs, backend=backend)
+    return {
+        "moyennes": mean_intervals(tensor, n_boot=n_boot, confidence=confidence, seed=seeds[0], **options),
+        "previsions": forecast_intervals(tensor, n_boot=n_boot, confidence=confidence, seed=seeds[1], **options),
+        "coclustering": coclustering_matrix(
+            features, n_clusters=n_clusters, n_boot=n_boot_clusters, seed=seeds[2], **options
+        ),
+    }
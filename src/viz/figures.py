@@ -0,0 +1,82 @@
+import plotly.express as px
+import plotly.graph_objects as go
+
+
+def annual_rate_map(df_filtered, geojson, annee):
+    """Carte du nombre d'infractions pour 1000 habitants (onglet « Vue annuelle »)."""
+    fig_map = px.choropleth(
+        df_filtered,
+        geojson=geojson,
+        locations="code_departement",
+        color="taux_pour_mille",
+        featureidkey="properties.code",
+        hover_name="nom_departement",
+        color_continuous_scale="OrRd",
+        range_color=(df_filtered["taux_pour_mille"].min(), df_filtered["taux_pour_mille"].max()),
+        title=f"Carte – Nombre d’infractions pour 1000 habitants ({annee})"
+    )
+    fig_map.update_geos(fitbounds="locations", visible=False)
+    fig_map.update_layout(
+        coloraxis_colorbar_title="Nombre pour 1000 habitants"
+    )
+    return fig_map
+
+
+def top10_rate_bar(df_filtered):
+    """Top 10 des départements pour 1000 habitants."""
+    top10 = df_filtered.sort_values("taux_pour_mille", ascending=False).head(10)
+    fig_bar = px.bar(
+        top10,
+        x="nom_departement",
+        y="taux_pour_mille",
+        color="taux_pour_mille",
+        color_continuous_scale="OrRd",
+        title="Top 10 départements – Nombre pour 1000 habitants",
+        labels={
+            "taux_pour_mille": "Nombre pour 1000 habitants",
+            "nom_departement": "Département"
+        }
+    )
+    fig_bar.update_layout(xaxis_title="Département", yaxis_title="Nombre pour 1000 habitants")
+    return fig_bar
+
+
+def anomaly_map(df_anom, geojson):
+    """Carte des départements au profil atypique (Isolation Forest)."""
+    fig_anom_map = px.choropleth(
+        df_anom,
+        geojson=geojson,
+        locations="code_departement",
+        color="profil",
+        featureidkey="properties.code",
+        hover_name="nom_departement",
+        hover_data={
+            "code_departement": False,
+            "profil": True,
+            "taux_pour_mille": ":.2f"
+        },
+        color_discrete_map={"Dans la norme": "lightgray", "Hors norme": "crimson"},
+    )
+
+    fig_anom_map.update_geos(
+        projection_type="mercator",
+        center={"lat": 46.6, "lon": 2.5},
+        fitbounds="geojson",
+        visible=False
+    )
+
+    fig_anom_map.update_layout(
+        height=750,
+        margin={"r": 0, "t": 40, "l": 0, "b": 0}
+    )
+    return fig_anom_map
+
+
+def table_figure(table, title=None):
+    """Tableau sous forme de figure, pour les exports statiques (PNG / PDF)."""
+    fig = go.Figure(go.Table(
+        header=dict(values=list(table.columns), fill_color="#f0f0f0", align="left"),
+        cells=dict(values=[table[col] for col in table.columns], align="left")
+    ))
+    fig.update_layout(title=title, margin={"r": 10, "t": 40, "l": 10, "b": 10})
+    return fig
@@ -0,0 +1,178 @@
+"""Rendu hors ligne des synthèses annuelles : carte, top 10 et tableau des départements
+hors norme pour chaque combinaison année × indicateur.
+
+    python -m src.viz.report --formats html png pdf --jobs 8
+
+Les exports PNG / PDF nécessitent le paquet optionnel `kaleido`.
+"""
+import argparse
+import hashlib
+import html
+import re
+import time
+import unicodedata
+from functools import lru_cache
+from itertools import repeat
+from pathlib import Path
+
+import pandas as pd
+
+from src.io.cache import dataset_version
+from src.io.geo import GEOJSON_DEPTS, load_geojson
+from src.io.loader import DATA_FILE, load_dataset
+from src.models.anomalies import COLONNES_TABLE, detect_anomalies
+from src.models.parallel import parallel_map
+from src.viz.figures import annual_rate_map, table_figure, top10_rate_bar
+
+FORMATS = ("html", "png", "pdf")
+FIGURES = ("carte", "top10", "anomalies")
+OUTPUT_DIR = Path("rapports")
+FINGERPRINT = ".empreinte"
+RENDERER_VERSION = 2  # à incrémenter lorsque la mise en page ou les figures changent
+
+
+def slugify(text):
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+
+@lru_cache(maxsize=1)
+def _geojson(path):
+    # Chargé une fois par processus de rendu
+    return load_geojson(path=path)
+
+
+@lru_cache(maxsize=1)
+def _geojson_version(path):
+    return dataset_version(path)
+
+
+def input_fingerprint(df_slice, formats, geojson_path):
+    """Empreinte des entrées d'une combinaison : données de la tranche, formats demandés,
+    version des contours et du moteur de rendu. Calculée avant toute construction de figure."""
+    h = hashlib.sha1()
+    h.update(f"{RENDERER_VERSION}|{_geojson_version(str(geojson_path))}|{','.join(sorted(formats))}".encode())
+    h.update(",".join(df_slice.columns).encode())
+    h.update(pd.util.hash_pandas_object(df_slice, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def _check_static_export(formats):
+    if {"png", "pdf"} & set(formats):
+        try:
+            import kaleido  # noqa: F401
+        except ImportError:
+            raise SystemExit("L'export PNG / PDF nécessite le paquet optionnel kaleido (pip install kaleido).")
+
+
+def _html_page(annee, indicateur, fig_map, fig_top, table):
+    titre = html.escape(f"{indicateur} – {annee}")
+    tableau = table.to_html(index=False, border=0) if not table.empty else "<p>Aucun département hors norme.</p>"
+    return (
+        "<!DOCTYPE html>\n<html lang='fr'>\n<head><meta charset='utf-8'>"
+        f"<title>{titre}</title></head>\n<body style='font-family: sans-serif'>\n"
+        f"<h1>{titre}</h1>\n"
+        f"{fig_map.to_html(full_html=False, include_plotlyjs=True)}\n"
+        f"{fig_top.to_html(full_html=False, include_plotlyjs=False)}\n"
+        "<h2>Départements au profil hors norme</h2>\n"
+        f"{tableau}\n</body>\n</html>\n"
+    )
+
+
+def render_combination(df_slice, annee, indicateur, out_dir, formats, geojson_path, force=False):
+    """Rendu d'une combinaison ; ignorée si ses entrées n'ont pas changé depuis le dernier rendu.
+
+    Renvoie (année, indicateur, statut, nombre de fichiers écrits, durée en secondes).
+    """
+    start = time.perf_counter()
+    target = Path(out_dir) / str(annee) / slugify(indicateur)
+
+    digest = input_fingerprint(df_slice, formats, geojson_path)
+    outputs = [target / "rapport.html"] if "html" in formats else []
+    outputs += [target / f"{name}.{fmt}" for fmt in ("png", "pdf") if fmt in formats
+                for name in FIGURES]
+
+    stamp = target / FINGERPRINT
+    if (not force and stamp.exists() and stamp.read_text() == digest
+            and all(path.exists() for path in outputs)):
+        return annee, indicateur, "inchangé", 0, time.perf_counter() - start
+
+    fig_map = annual_rate_map(df_slice, _geojson(str(geojson_path)), annee)
+    fig_map.update_layout(title=f"{indicateur} – nombre pour 1000 habitants ({annee})")
+    fig_top = top10_rate_bar(df_slice)
+    table = detect_anomalies(df_slice)[1]
+    if table is None:
+        table = pd.DataFrame(columns=COLONNES_TABLE)
+    figures = dict(zip(FIGURES, (
+        fig_map, fig_top, table_figure(table, title="Départements au profil hors norme")
+    )))
+
+    target.mkdir(parents=True, exist_ok=True)
+    for path in outputs:
+        if path.suffix == ".html":
+            path.write_text(_html_page(annee, indicateur, fig_map, fig_top, table), encoding="utf-8")
+        else:
+            figures[path.stem].write_image(path, width=1200, height=800)
+    stamp.write_text(digest)
+    return annee, indicateur, "rendu", len(outputs), time.perf_counter() - start
+
+
+def render_all(df, out_dir=OUTPUT_DIR, formats=("html",), years=None, indicators=None, n_jobs=None, force=False):
+    """Rend toutes les combinaisons année × indicateur en parallèle.
+
+    Renvoie un DataFrame (une ligne par combinaison) et la durée totale en secondes.
+    """
+    _check_static_export(formats)
+    load_geojson()  # copie locale disponible avant le démarrage des processus
+
+    if years is not None:
+        df = df[df["annee"].isin(years)]
+    if indicators is not None:
+        df = df[df["indicateur"].isin(indicators)]
+    groups = list(df.groupby(["annee", "indicateur"]))
+
+    start = time.perf_counter()
+    results = parallel_map(
+        render_combination,
+        [g for _, g in groups],
+        [key[0] for key, _ in groups],
+        [key[1] for key, _ in groups],
+        repeat(Path(out_dir)),
+        repeat(tuple(formats)),
+        repeat(GEOJSON_DEPTS),
+        repeat(force),
+        n_jobs=n_jobs,
+    )
+    elapsed = time.perf_counter() - start
+    return pd.DataFrame(results, columns=["annee", "indicateur", "statut", "fichiers", "duree_s"]), elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--donnees", default=DATA_FILE, help="fichier CSV départemental")
+    parser.add_argument("--sortie", default=OUTPUT_DIR, help="répertoire des rapports")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=["html"])
+    parser.add_argument("--annees", nargs="+", type=int, help="années à rendre (toutes par défaut)")
+    parser.add_argument("--indicateurs", nargs="+", help="indicateurs à rendre (tous par défaut)")
+    parser.add_argument("--jobs", type=int, default=None, help="processus de rendu (un par cœur par défaut)")
+    parser.add_argument("--force", action="store_true", help="ignorer les empreintes et tout rendre")
+    args = parser.parse_args(argv)
+
+    df = load_dataset(args.donnees)
+    results, elapsed = render_all(
+        df, out_dir=args.sortie, formats=args.formats, years=args.annees,
+        indicators=args.indicateurs, n_jobs=args.jobs, force=args.force
+    )
+
+    n = len(results)
+    rendered = int((results["statut"] == "rendu").sum())
+    print(
+        f"{n} combinaisons en {elapsed:.1f} s ({n / elapsed if elapsed else 0:.2f} combinaisons/s) – "
+        f"{rendered} rendues, {n - rendered} inchangées, {int(results['fichiers'].sum())} fichiers écrits"
+    )
+    if rendered:
+        print(f"Durée moyenne de rendu : {results.loc[results['statut'] == 'rendu', 'duree_s'].mean():.2f} s par combinaison")
+
+
+if __name__ == "__main__":
+    main()